@@ -2,20 +2,23 @@ import csv
 import os
 import re
 import sys
-import time
 from concurrent.futures import TimeoutError
 
 import phonenumbers
-import requests
-from bs4 import BeautifulSoup
 from names_dataset import NameDataset
 from ordered_set import OrderedSet
 from pyisemail import is_email
-from selenium import webdriver
-from usp.tree import sitemap_tree_for_homepage
-from usp.web_client.requests_client import RequestsWebClient
 
-from utils import check_email_accessible
+from crawler import AsyncCrawler
+from http_client import get_client
+from page_document import PageDocument, page_document
+from page_results import PageResults, results_key
+from page_store import PageStore
+from reaper import Reaper
+from render import get_main_page
+from sitemaps import SitemapStream, canonical_homepages
+from url_index import LEADER, TEAM, UrlIndex
+from utils import DEADLINE_SHARE, Deadline, check_email_accessible, get_base_url, resolve_links
 
 dataset = NameDataset()
 
@@ -24,10 +27,6 @@ class TimeoutException(Exception):
     pass
 
 
-class _RequestsWebClient(RequestsWebClient):
-    __USER_AGENT = 'Mozilla/5.0'
-
-
 class LeadGeneration(object):
 
     words_for_company_leader = [
@@ -39,14 +38,25 @@ class LeadGeneration(object):
         'about_us', 'kontakt', 'contact', 'contatti', 'firma', 'corporate', 'company', 'impressum', 'agentur', 'buero'
     ]
 
-    def __init__(self, website: str, all_pages: int = 0) -> None:
+    def __init__(self, website: str, all_pages: int = 0, timeout: int = 3600) -> None:
         self.website = website
         self.result_file = 'results.xlsx'
         self.headers = {'User-Agent': 'Mozilla/5.0'}
         self.all_pages = all_pages
+        self.timeout = timeout
+        self.deadline = None
+        self.pages = PageStore(self.client)
+        self.url_index = None
+
+    @property
+    def client(self):
+        """http client of the current process"""
+        return get_client(self.headers)
 
     def start(self) -> None:
         """run program"""
+        # browsers left by earlier runs which were killed
+        Reaper().sweep()
         self.get_or_create_results_file()
         self.check_domain()
 
@@ -71,21 +81,26 @@ class LeadGeneration(object):
         sitemap_leader_name = list()
         temp_phones = list()
         temp_emails = list()
+        main_page_source = ''
+
+        # time budget of the website, every request, page load and email check gets what is left of it
+        self.deadline = Deadline(self.timeout * DEADLINE_SHARE)
+        self.client.deadline = self.deadline
 
         try:
 
-            # get main page html
-            main_page_html = self.get_html_with_selenium(self.website)
+            # get main page html (the browser renders it only if the plain download is not enough)
+            main_page, main_page_source = get_main_page(self.pages, self.website, self.deadline)
 
             try:
                 # get data from main page
-                main_page_phone, main_page_email, _, _ = self.get_contact_information(main_page_html)
+                main_page_phone, main_page_email, _, _ = self.get_contact_information(main_page)
             except Exception as e:
                 print(f'get data from main page: {e}')
 
             try:
                 # find impressum in main page
-                impressum_htmls = self.get_impressum(main_page_html)
+                impressum_htmls = self.get_impressum(main_page)
                 if impressum_htmls:
                     for html in impressum_htmls:
                         phones_i, emails_i, _, _ = self.get_contact_information(html)
@@ -100,7 +115,7 @@ class LeadGeneration(object):
 
             try:
                 # get all contacts htmls from main page html
-                contacts_htmls = self.get_contacts_html(main_page_html)
+                contacts_htmls = self.get_contacts_html(main_page)
 
                 # get data from each contact html
                 if contacts_htmls:
@@ -164,6 +179,8 @@ class LeadGeneration(object):
                     if self.all_pages == 1:
                         all_pages_leader_phone, all_pages_leader_email, all_pages_leader_name = self.check_phones_emails_on_every_page(sitemap_tree) # noqa
 
+                    print(f'sitemap {self.website}: {sitemap_tree.report()} ({self.get_url_index(sitemap_tree).report()})')  # noqa
+
             except Exception as e:
                 print(f'sitemap_tree: {e}')
 
@@ -191,7 +208,7 @@ class LeadGeneration(object):
                     email_leader = list()
                     for name in name_leader:
                         if len(name.split(sep=' ')) == 2:
-                            em = self.gen_email(name_leader, self.website)
+                            em = self.gen_email(name_leader, self.website, self.deadline)
                             if em:
                                 email_leader.append(em)
             except IndexError:
@@ -231,6 +248,8 @@ class LeadGeneration(object):
             except Exception as e:
                 print(f'del info office and other from email_leader: {e}')
 
+            print(f'page store {self.website}: {self.pages.report()}')
+
             self.write_to_file(
                 website=self.website,
                 name_leader=name_leader,
@@ -246,7 +265,8 @@ class LeadGeneration(object):
                 mail_main=main_page_email,
                 sitemap_leader_name_from_team=sitemap_leader_name_from_team,
                 sitemap_contacts_from_team=sitemap_contacts_from_team,
-                full_contacts=full_contacts
+                full_contacts=full_contacts,
+                main_page_source=main_page_source
             )
 
         except Exception as e:
@@ -266,11 +286,12 @@ class LeadGeneration(object):
                 mail_main=main_page_email,
                 sitemap_leader_name_from_team=sitemap_leader_name_from_team,
                 sitemap_contacts_from_team=sitemap_contacts_from_team,
-                full_contacts=full_contacts
+                full_contacts=full_contacts,
+                main_page_source=main_page_source
             )
 
     @staticmethod
-    def gen_email(leader_name, homepage):
+    def gen_email(leader_name, homepage, deadline=None):
         """the method generates emails from the name of the head of the company and checks their availability"""
 
         to_return = list()
@@ -300,7 +321,7 @@ class LeadGeneration(object):
             to_return.append(temp)
 
             for email in to_return:
-                r = check_email_accessible(email)
+                r = check_email_accessible(email, deadline)
                 if r is True:
                     result.append(email)
             if len(result) > 1:
@@ -310,111 +331,65 @@ class LeadGeneration(object):
 
         return result
 
-    @staticmethod
-    def get_html_with_selenium(url: str) -> str:
-        """get main page html"""
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.headless = True
-        browser = webdriver.Chrome('chromedriver', chrome_options=chrome_options)
-        browser.get(url)
-        time.sleep(5)
-        html = browser.page_source
-        return html
-
-    def get_sitemap_tree(self) -> list:
-        """get all links from sitemap"""
-        sitemap_tree = list()
-        web_client = _RequestsWebClient()
-        try:
-            tree = sitemap_tree_for_homepage(self.website, web_client)
-            for page in tree.all_pages():
-                sitemap_tree.append(page.url)
-        except Exception as e:
-            print(f'get_sitemap_tree: {e}')
-        return sitemap_tree
+    def get_sitemap_tree(self) -> SitemapStream:
+        """get all links from sitemap (lazily: the passes over it start with the first sitemap)"""
+        return SitemapStream(self.client, canonical_homepages([self.website], self.pages), self.deadline)
 
-    def get_contacts_html(self, main_page_html: str) -> list:
-        """looking for a section with contacts on the main page and get htmls"""
-        html_list = list()
-        main_page_soup = BeautifulSoup(main_page_html, 'lxml')
+    def get_url_index(self, sitemap_tree: SitemapStream) -> UrlIndex:
+        """buckets of the sitemap urls, classified once for all passes"""
+        if self.url_index is None or self.url_index.sitemap is not sitemap_tree:
+            self.url_index = UrlIndex(sitemap_tree, self.words_for_company_leader, self.words_for_company_team)
+        return self.url_index
+
+    def get_contacts_html(self, main_page: PageDocument) -> list:
+        """looking for a section with contacts on the main page and get their pages"""
+        links = list()
         try:
-            links = [[link.get('href'), link] for link in main_page_soup.findAll('a')]
-            for result in links:
-                link = result[0]
-                tag_text = str(result[1].text).lower()
-                for word in self.words_for_company_team:
-                    if link is not None and (word in link or word in tag_text):
-                        try:
-                            response = requests.get(self.website + '/' + link, headers=self.headers)
-                            if response.status_code == 200:
-                                html_list.append(response.text)
-                                continue
-                        except:  # noqa
-                            pass
-                        try:
-                            response = requests.get(self.website + link, headers=self.headers)
-                            if response.status_code == 200:
-                                html_list.append(response.text)
-                                continue
-                        except:  # noqa
-                            pass
-                        try:
-                            response = requests.get(link, headers=self.headers)
-                            if response.status_code == 200:
-                                html_list.append(response.text)
-                                continue
-                        except:  # noqa
-                            pass
+            for link, tag_text in main_page.anchors:
+                if any(word in link or word in tag_text for word in self.words_for_company_team):
+                    links.append(link)
         except Exception as e: # noqa
             print(f'get_contacts_urls: {e}')
-        return html_list
+        return self.get_htmls(main_page, links)
 
-    def get_impressum(self, main_page_html: str) -> list:
-        """looking for a impressum section on the main page and get htmls"""
-        html_list = list()
-        main_page_soup = BeautifulSoup(main_page_html, 'lxml')
+    def get_impressum(self, main_page: PageDocument) -> list:
+        """looking for a impressum section on the main page and get their pages"""
+        links = list()
         try:
-            links = [[link.get('href'), link] for link in main_page_soup.findAll('a')]
-            for result in links:
-                link = result[0]
-                tag_text = str(result[1].text).lower()
-                if link is not None and ('impressum' in link or 'impressum' in tag_text or 'kontakt' in link or 'kontakt' in tag_text or 'contact' in link or 'contact' in tag_text): # noqa
-                    try:
-                        response = requests.get(self.website + '/' + link, headers=self.headers)
-                        if response.status_code == 200:
-                            html_list.append(response.text)
-                    except:  # noqa
-                        pass
-                    try:
-                        response = requests.get(self.website + link, headers=self.headers)
-                        if response.status_code == 200:
-                            html_list.append(response.text)
-                    except:  # noqa
-                        pass
-                    try:
-                        response = requests.get(link, headers=self.headers)
-                        if response.status_code == 200:
-                            html_list.append(response.text)
-                    except:  # noqa
-                        pass
+            for link, tag_text in main_page.anchors:
+                if 'impressum' in link or 'impressum' in tag_text or 'kontakt' in link or 'kontakt' in tag_text or 'contact' in link or 'contact' in tag_text: # noqa
+                    links.append(link)
         except Exception as e: # noqa
             print(f'get_impressum: {e}')
-        return html_list
+        return self.get_htmls(main_page, links)
 
-    def get_contact_information(self, text, leader=False) -> tuple:
-        """the method searches for contact information on the page"""
+    def get_htmls(self, main_page: PageDocument, links: list) -> list:
+        """resolve links against the url the main page was found at (after its redirects) once and get the
+        pages (one request per unique url), each one is parsed once for all extractors"""
+        page_list = list()
+        for link in resolve_links(get_base_url(main_page.soup, main_page.url or self.website), links):
+            try:
+                response = self.pages.get(link)
+                if response.status_code == 200:
+                    page_list.append(PageDocument(response.text, response.final_url))
+            except Exception as e: # noqa
+                print(f'get_htmls: {e}')
+        return page_list
+
+    def get_contact_information(self, page, leader=False) -> tuple:
+        """the method searches for contact information on the page (html or a parsed PageDocument)"""
         phones = list()
         names = list()
         emails = list()
         contacts = list()
-        soup = BeautifulSoup(text, 'lxml')
+        document = page_document(page)
 
         try:
             if leader is False:
 
                 # get phone
                 try:
-                    for match in phonenumbers.PhoneNumberMatcher(text, "CH"):
+                    for match in phonenumbers.PhoneNumberMatcher(document.html, "CH"):
                         phone = str(match).split(sep=') ', maxsplit=1)[1]
                         if phone:
                             phones.append(phone)
@@ -423,15 +398,15 @@ class LeadGeneration(object):
 
                 # get email
                 try:
-                    results = soup.findAll(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
+                    results = document.soup.findAll(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                     if not results:
-                        results = soup.findAll(text=re.compile(r'[\w\.-]+\(at\)[\w\.-]+(\.[\w]+)+'))  # noqa
+                        results = document.soup.findAll(text=re.compile(r'[\w\.-]+\(at\)[\w\.-]+(\.[\w]+)+'))  # noqa
                     if not results:
-                        results = soup.findAll(text=re.compile(r'[\w\.-]+\[at\][\w\.-]+(\.[\w]+)+'))  # noqa
+                        results = document.soup.findAll(text=re.compile(r'[\w\.-]+\[at\][\w\.-]+(\.[\w]+)+'))  # noqa
                     if not results:
-                        results = soup.findAll(text=re.compile(r'[\w\.-]+\[ät\][\w\.-]+(\.[\w]+)+'))  # noqa
+                        results = document.soup.findAll(text=re.compile(r'[\w\.-]+\[ät\][\w\.-]+(\.[\w]+)+'))  # noqa
                     if not results:
-                        results = soup.findAll(text=re.compile(r'[\w\.-]+\(ät\)[\w\.-]+(\.[\w]+)+'))  # noqa
+                        results = document.soup.findAll(text=re.compile(r'[\w\.-]+\(ät\)[\w\.-]+(\.[\w]+)+'))  # noqa
                     if results is not None:
                         for email in results:
                             email = email.strip()
@@ -449,12 +424,12 @@ class LeadGeneration(object):
 
                 for word in self.words_for_company_leader:
                     temp_contact = dict()
-                    if word in str(soup):
+                    if word in document.serialized:
                         try:
 
                             # get name
                             try:
-                                text_from_phone = str(soup.find(text=re.compile(word)).parent.text).strip().replace('\n', ' ') # noqa TODO
+                                text_from_phone = str(document.find_text(word).parent.text).strip().replace('\n', ' ') # noqa TODO
                                 name = self.get_names([text_from_phone])
                                 temp_contact['word'] = word
                                 if name:
@@ -462,21 +437,21 @@ class LeadGeneration(object):
                                     temp_contact['name'] = name
 
                                 else:
-                                    text_from_phone = str(soup.find(text=re.compile(word)).parent.parent.text).strip().replace('\n', ' ')  # noqa TODO
+                                    text_from_phone = str(document.find_text(word).parent.parent.text).strip().replace('\n', ' ')  # noqa TODO
                                     name = self.get_names([text_from_phone])
                                     if name:
                                         names.append(name)
                                         temp_contact['name'] = name
 
                                     # else:
-                                    #     text_from_phone = str(soup.find(text=re.compile(word)).parent.parent.parent.text).strip().replace('\n', ' ')  # noqa TODO
+                                    #     text_from_phone = str(document.find_text(word).parent.parent.parent.text).strip().replace('\n', ' ')  # noqa TODO
                                     #     name = self.get_names([text_from_phone])
                                     #     if name:
                                     #         names.append(name)
                                     #         temp_contact['name'] = name
 
                                         # else:
-                                        #     text_from_phone = str(soup.find(text=re.compile(word)).parent.parent.parent.parent.text).strip().replace('\n', ' ')  # noqa TODO
+                                        #     text_from_phone = str(document.find_text(word).parent.parent.parent.parent.text).strip().replace('\n', ' ')  # noqa TODO
                                         #     name = self.get_names([text_from_phone])
                                         #     if name:
                                         #         names.append(name)
@@ -488,7 +463,7 @@ class LeadGeneration(object):
                             try:
                                 result = ''
                                 try:
-                                    res = phonenumbers.PhoneNumberMatcher(str(soup.find(text=re.compile(word)).parent), "CH")  # noqa TODO
+                                    res = phonenumbers.PhoneNumberMatcher(str(document.find_text(word).parent), "CH")  # noqa TODO
                                     for match in res:  # noqa TODO
                                         result = str(match).split(sep=') ', maxsplit=1)[1]
                                         if result:
@@ -498,7 +473,7 @@ class LeadGeneration(object):
 
                                 if not result:
                                     try:
-                                        res = phonenumbers.PhoneNumberMatcher(str(soup.find(text=re.compile(word)).parent.parent), "CH")  # noqa TODO
+                                        res = phonenumbers.PhoneNumberMatcher(str(document.find_text(word).parent.parent), "CH")  # noqa TODO
                                         for match in res:  # noqa TODO
                                             result = str(match).split(sep=') ', maxsplit=1)[1]
                                             if result:
@@ -508,7 +483,7 @@ class LeadGeneration(object):
 
                                 # if not result:
                                 #     try:
-                                #         res = phonenumbers.PhoneNumberMatcher(str(soup.find(text=re.compile(word)).parent.parent.parent), "CH")  # noqa TODO
+                                #         res = phonenumbers.PhoneNumberMatcher(str(document.find_text(word).parent.parent.parent), "CH")  # noqa TODO
                                 #         for match in res:  # noqa TODO
                                 #             result = str(match).split(sep=') ', maxsplit=1)[1]
                                 #             if result:
@@ -532,7 +507,7 @@ class LeadGeneration(object):
 
                             # get email
                             try:
-                                tag = soup.find(text=re.compile(word)).parent
+                                tag = document.find_text(word).parent
                                 email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                                 if not email:
                                     email = tag.find(text=re.compile(r'[\w\.-]+\(at\)[\w\.-]+(\.[\w]+)+'))  # noqa
@@ -560,7 +535,7 @@ class LeadGeneration(object):
                                             temp_contact['email'] = email_temp[0]
 
                                 if not email:
-                                    tag = soup.find(text=re.compile(word)).parent.parent  # TODO
+                                    tag = document.find_text(word).parent.parent  # TODO
                                     email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                                     if not email:
                                         email = tag.find(text=re.compile(r'[\w\.-]+\(at\)[\w\.-]+(\.[\w]+)+'))  # noqa
@@ -588,7 +563,7 @@ class LeadGeneration(object):
                                                 temp_contact['email'] = email_temp[0]
 
                                 # if not email:
-                                #     tag = soup.find(text=re.compile(word)).parent.parent.parent  # TODO
+                                #     tag = document.find_text(word).parent.parent.parent  # TODO
                                 #     email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                                 #     if not email:
                                 #         email = tag.find(text=re.compile(r'[\w\.-]+\(at\)[\w\.-]+(\.[\w]+)+'))  # noqa
@@ -616,7 +591,7 @@ class LeadGeneration(object):
                                 #                 temp_contact['email'] = email_temp[0]
 
                                 # if not email:
-                                #     tag = soup.find(text=re.compile(word)).parent.parent.parent.parent  # TODO
+                                #     tag = document.find_text(word).parent.parent.parent.parent  # TODO
                                 #     email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                                 #     if not email:
                                 #         email = tag.find(text=re.compile(r'[\w\.-]+\(at\)[\w\.-]+(\.[\w]+)+'))  # noqa
@@ -723,6 +698,7 @@ class LeadGeneration(object):
         columns.append('all_pages_leader_email')
         columns.append('sitemap_leader_name_from_team')
         # columns.append('sitemap_contacts_from_team')
+        columns.append('main_page_source')
 
         if not os.path.exists('results.xlsx'):
             with open(self.result_file, "w", newline="", encoding='UTF-8') as f:
@@ -733,7 +709,8 @@ class LeadGeneration(object):
             self, website, name_leader,
             phone_leader, sitemap_leader_phone, sitemap_leader_phone_from_team, all_pages_leader_phone,
             email_leader, sitemap_leader_email, sitemap_leader_email_from_team, all_pages_leader_email,
-            phone_main, mail_main, full_contacts, sitemap_leader_name_from_team, sitemap_contacts_from_team
+            phone_main, mail_main, full_contacts, sitemap_leader_name_from_team, sitemap_contacts_from_team,
+            main_page_source=''
     ):
         """write data to file"""
         if not website:
@@ -807,6 +784,7 @@ class LeadGeneration(object):
         lst.append(all_pages_leader_email)
         lst.append(sitemap_leader_name_from_team)
         # lst.append(sitemap_contacts_from_team)
+        lst.append(main_page_source)
 
         # with csv lib
         with open(self.result_file, "a", newline="", encoding='UTF-8') as f:
@@ -819,19 +797,23 @@ class LeadGeneration(object):
         bool_result = is_email(email)
         return bool_result
 
-    def get_leader_phone_and_email_from_sitemap(self, sitemap_tree: list) -> tuple:
+    def get_leader_phone_and_email_from_sitemap(self, sitemap_tree: SitemapStream) -> tuple:
         """looking for the phone number and the email of the head of the company"""
         leader_phone = []
         leader_email = []
         leader_name = []
         try:
-            for url in sitemap_tree:
-                for word in self.words_for_company_leader:
-                    if word in url:
-                        phones, emails, names, _ = self.get_contact_information(requests.get(url, headers=self.headers).text, leader=True)  # noqa
-                        leader_phone.append(phones)
-                        leader_email.append(emails)
-                        leader_name.append(names)
+            # the result does not depend on the keyword, so one check per url is enough
+            for url in self.get_url_index(sitemap_tree).urls(LEADER):
+                try:
+                    document = PageDocument(self.pages.get(url).text, url)
+                except Exception as e: # noqa
+                    print(f'get_leader_phone_and_email_from_sitemap {url}: {e}')
+                    continue
+                phones, emails, names, _ = self.get_contact_information(document, leader=True)
+                leader_phone.append(phones)
+                leader_email.append(emails)
+                leader_name.append(names)
         except Exception as e: # noqa
             print(f'get_leader_phone_and_email_from_sitemap: {e}')
         phones = [j for i in leader_phone for j in i]
@@ -842,22 +824,24 @@ class LeadGeneration(object):
         names = self.unique(names)
         return phones, emails, names
 
-    def get_leader_phone_and_email_from_sitemap_section_team(self, sitemap_tree: list) -> tuple:
+    def get_leader_phone_and_email_from_sitemap_section_team(self, sitemap_tree: SitemapStream) -> tuple:
         """looking for leader phone and email number in team section"""
         leader_phone_from_team = []
         leader_email_from_team = []
         leader_name_from_team = []
         leader_contacts_from_team = []
         try:
-            for url in sitemap_tree:
-                for word in self.words_for_company_team:
-                    if word in url:
-
-                        phones, emails, names, contacts = self.get_contact_information(requests.get(url, headers=self.headers).text, leader=True) # noqa
-                        leader_phone_from_team.append(phones)
-                        leader_email_from_team.append(emails)
-                        leader_name_from_team.append(names)
-                        leader_contacts_from_team.append(contacts)
+            for url in self.get_url_index(sitemap_tree).urls(TEAM):
+                try:
+                    document = PageDocument(self.pages.get(url).text, url)
+                except Exception as e: # noqa
+                    print(f'get_leader_phone_and_email_from_sitemap_section_team {url}: {e}')
+                    continue
+                phones, emails, names, contacts = self.get_contact_information(document, leader=True)
+                leader_phone_from_team.append(phones)
+                leader_email_from_team.append(emails)
+                leader_name_from_team.append(names)
+                leader_contacts_from_team.append(contacts)
 
         except Exception as e: # noqa
             print(f'get_leader_phone_and_email_from_sitemap_section_team: {e}')
@@ -870,7 +854,7 @@ class LeadGeneration(object):
         contacts = [j for i in leader_contacts_from_team for j in i]
         return phones, emails, names, contacts
 
-    def check_phones_emails_on_every_page(self, sitemap_tree: list) -> tuple:
+    def check_phones_emails_on_every_page(self, sitemap_tree: SitemapStream) -> tuple:
         """looking for phones, emails on each page"""
         try:
             all_pages_phone, all_pages_emails, all_pages_name, _ = self.check_every_page(sitemap_tree)
@@ -878,25 +862,28 @@ class LeadGeneration(object):
         except Exception as e:
             print(f'check_phones_emails_on_every_page: {e}')
 
-    def check_every_page(self, sitemap_tree: list) -> tuple:
-        """check each page for  phones, emails"""
+    def check_every_page(self, sitemap_tree: SitemapStream) -> tuple:
+        """check each page for  phones, emails (pages which did not change since the last run are taken
+        from its results)"""
         phones_every_page = []
         emails_every_page = []
         names_every_page = []
         contacts_every_page = []
-        for url in sitemap_tree:
-            try:
-                response = requests.get(url, headers=self.headers)
-                text = response.text
 
-                phones, emails, names, contacts = self.get_contact_information(text, leader=True)
-                phones_every_page.append(phones)
-                emails_every_page.append(emails)
-                names_every_page.append(names)
-                contacts_every_page.append(contacts)
-
-            except Exception as e:
-                print(f'check_every_page: {e}')
+        def check_page(text: str) -> tuple:
+            return self.get_contact_information(text, leader=True)
+
+        crawler = AsyncCrawler(
+            lambda url: self.pages.get(url, keep=False), scheduler=self.client.scheduler, deadline=self.deadline
+        )
+        page_results = PageResults('collect_contact_information', results_key(self.words_for_company_leader))
+        for phones, emails, names, contacts in page_results.check_pages(sitemap_tree, crawler, check_page):
+            phones_every_page.append(phones)
+            emails_every_page.append(emails)
+            names_every_page.append(names)
+            contacts_every_page.append(contacts)
+        print(f'check_every_page concurrency: {crawler.controller.report()}')
+        print(f'check_every_page pages: {page_results.report()}')
 
         phones_every_page = [j for i in phones_every_page for j in i]
         phones_every_page = self.unique_phones(phones_every_page)
@@ -930,8 +917,10 @@ if __name__ == '__main__':
     # get one website
     site_url = sys.argv[1]
     mode = int(sys.argv[2])
+    # time budget of the site in seconds (optional)
+    timeout = int(sys.argv[3]) if len(sys.argv) > 3 else 3600
 
     # run one site
-    obj = LeadGeneration(site_url, mode)
+    obj = LeadGeneration(site_url, mode, timeout)
     print(f'url_started: {site_url}')
     obj.start()
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from http_client import POOL_MAXSIZE, NotHtml
+
+# requests in flight for the whole crawl
+CONCURRENCY = 100
+
+# upper bound of requests in flight per host (no more than the keep-alive connections of one host)
+HOST_CONCURRENCY = POOL_MAXSIZE
+
+# requests in flight per host before the controller has seen any response
+INITIAL_HOST_CONCURRENCY = 2
+
+# a response slower than this (seconds) does not count as healthy
+SLOW_RESPONSE = 3.0
+
+# share of failed requests among the last ERROR_WINDOW ones after which the host is backed off
+ERROR_RATE = 0.25
+ERROR_WINDOW = 20
+
+# urls taken from the source ahead of the fetches, per concurrency slot
+PENDING = 10
+
+# statuses which mean "slow down"
+BACKOFF_STATUSES = {429, 503}
+
+
+class AimdController(object):
+    """adaptive per-host concurrency: additive increase while the host answers fast and without errors,
+    multiplicative decrease on 429/503, timeouts and high error rates"""
+
+    def __init__(self, initial=INITIAL_HOST_CONCURRENCY, minimum=1, maximum=HOST_CONCURRENCY):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limits = dict()
+        self.healthy = defaultdict(int)
+        self.outcomes = defaultdict(lambda: deque(maxlen=ERROR_WINDOW))
+        self.decreased_at = dict()
+        self.reasons = defaultdict(Counter)
+
+    def limit(self, host):
+        """current number of requests allowed in flight to the host"""
+        return self.limits.get(host, self.initial)
+
+    def record(self, host, started, status=None, error=None):
+        """take the outcome of a request started at `started` (time.monotonic()) into account"""
+        latency = time.monotonic() - started
+        failed = error is not None or (status is not None and status >= 500)
+        self.outcomes[host].append(failed)
+
+        if isinstance(error, requests.exceptions.Timeout):
+            self.decrease(host, started, 'timeout')
+        elif status in BACKOFF_STATUSES:
+            self.decrease(host, started, f'status {status}')
+        elif len(self.outcomes[host]) >= ERROR_WINDOW / 2 and \
+                sum(self.outcomes[host]) / len(self.outcomes[host]) > ERROR_RATE:
+            self.decrease(host, started, 'error rate')
+        elif not failed and latency <= SLOW_RESPONSE:
+            # one step up per window of healthy responses as large as the current limit
+            self.healthy[host] += 1
+            if self.healthy[host] >= self.limit(host):
+                self.healthy[host] = 0
+                self.change(host, self.limit(host) + 1, 'healthy')
+        elif latency > SLOW_RESPONSE:
+            self.healthy[host] = 0
+            self.reasons[host]['slow'] += 1
+
+    def decrease(self, host, started, reason):
+        """halve the limit, once per round: requests started before the last decrease do not count"""
+        if started < self.decreased_at.get(host, 0):
+            return
+        self.decreased_at[host] = time.monotonic()
+        self.healthy[host] = 0
+        self.outcomes[host].clear()
+        self.change(host, self.limit(host) // 2, reason)
+
+    def change(self, host, limit, reason):
+        limit = max(self.minimum, min(self.maximum, limit))
+        if limit != self.limit(host):
+            self.limits[host] = limit
+            self.reasons[host][reason] += 1
+
+    def metrics(self):
+        """current concurrency per host and the reasons it changed"""
+        return {
+            host: {'concurrency': self.limit(host), 'changes': dict(self.reasons[host])}
+            for host in set(self.limits) | set(self.reasons)
+        }
+
+    def report(self):
+        return ', '.join(
+            f"{host}: {value['concurrency']} {value['changes']}" for host, value in sorted(self.metrics().items())
+        )
+
+
+class AsyncCrawler(object):
+    """asyncio fetch engine with bounded global and adaptive per-host concurrency
+
+    fetch is a blocking function (url -> response) driven from a thread pool, so every request
+    still goes through the keep-alive connection pools of the http client"""
+
+    def __init__(self, fetch, scheduler=None, controller=None, deadline=None, concurrency=CONCURRENCY):
+        self.fetch = fetch
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.controller = controller or AimdController()
+        self.concurrency = concurrency
+
+    def crawl(self, urls, handler):
+        """fetch all urls and pass every response to handler(url, response) as soon as it arrives
+
+        urls may be a lazy iterable (e.g. a sitemaps.SitemapStream), it is consumed while the first
+        pages are fetched"""
+        asyncio.run(self._crawl(urls, handler))
+
+    async def _crawl(self, urls, handler):
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(self.concurrency)
+        in_flight = defaultdict(int)
+        host_slots = defaultdict(asyncio.Condition)
+
+        async def release(host):
+            async with host_slots[host]:
+                in_flight[host] -= 1
+                host_slots[host].notify(max(0, self.controller.limit(host) - in_flight[host]))
+
+        # one more thread for pulling the next url from a lazy source
+        with ThreadPoolExecutor(max_workers=self.concurrency + 1) as executor:
+
+            async def fetch(url):
+                if self.deadline is not None and self.deadline.expired():
+                    return
+                host = urlsplit(url).netloc
+
+                # take the host slot first so that one slow host can not hold the global slots
+                async with host_slots[host]:
+                    await host_slots[host].wait_for(lambda: in_flight[host] < self.controller.limit(host))
+                    in_flight[host] += 1
+                try:
+                    if self.deadline is not None and self.deadline.expired():
+                        return
+                    if self.scheduler is not None:
+                        # wait for the turn of the host in the event loop, other hosts go on meanwhile
+                        try:
+                            delay = await loop.run_in_executor(executor, self.scheduler.reserve, url)
+                        except Exception as e:
+                            print(f'crawl: {url}: {e}')
+                            delay = 0
+                        await asyncio.sleep(delay)
+                    async with limit:
+                        started = time.monotonic()
+                        try:
+                            response = await loop.run_in_executor(executor, self.fetch, url)
+                        except NotHtml:
+                            # pdf, images and the like are skipped, this says nothing about the host
+                            return
+                        except Exception as e:
+                            self.controller.record(host, started, error=e)
+                            print(f'crawl: {url}: {e}')
+                            return
+                        finally:
+                            if self.scheduler is not None:
+                                self.scheduler.release(url)
+                        self.controller.record(host, started, status=response.status_code)
+                finally:
+                    await release(host)
+
+                # handlers run in the event loop thread, one at a time; a failing handler loses its page only,
+                # not the crawl (an exception left in a task would be dropped or cancel the other tasks)
+                try:
+                    handler(url, response)
+                except Exception as e:
+                    print(f'crawl: {url}: handler: {e}')
+
+            async def task(url):
+                try:
+                    await fetch(url)
+                finally:
+                    pending.release()
+
+            # urls are taken from the source while earlier ones are fetched, at most PENDING per
+            # concurrency slot wait for their host, so a lazy source is never read far ahead
+            pending = asyncio.Semaphore(self.concurrency * PENDING)
+            tasks = set()
+            iterator = iter(urls)
+            while True:
+                await pending.acquire()
+                url = await loop.run_in_executor(executor, next, iterator, None)
+                if url is None:
+                    break
+                future = asyncio.ensure_future(task(url))
+                tasks.add(future)
+                future.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
@@ -49,9 +49,15 @@ class DB(object):
                      leader_email_without_sitemap TEXT,
                      emails_all_pages TEXT,
                      leader_email_sitemap TEXT,
-                     leader_email_from_team_sitemap TEXT
+                     leader_email_from_team_sitemap TEXT,
+                     main_page_source TEXT
                      );''')
 
+        # tables created before the column was added
+        self.cur.execute(
+            '''ALTER TABLE Domains_and_subdomains ADD COLUMN IF NOT EXISTS main_page_source TEXT'''
+        )
+
         self.connection.commit()
 
 
@@ -0,0 +1,154 @@
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from multiprocessing import util
+
+import dns.resolver
+
+# one file for all worker processes of a run (and for the next runs while the entries are fresh)
+DNS_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'store_identifier_dns.sqlite')
+
+# the system resolver does not tell the ttl of an address, so addresses are kept this long (seconds)
+ADDRESS_TTL = 300
+
+# names which do not exist or have no records of the type
+NEGATIVE_TTL = 300
+
+MAX_TTL = 24 * 3600
+
+_cache = None
+
+
+class DnsCache(object):
+    """dns cache shared by the worker processes (sqlite file) with an in-process layer in front of it
+
+    addresses (A/AAAA) come from the system resolver through socket.getaddrinfo, mx records from
+    dnspython with their ttl. negative answers are cached as well. The threads of a process share one
+    sqlite connection (used under the lock), expired entries are deleted when a process opens it"""
+
+    def __init__(self, path=DNS_CACHE_PATH, getaddrinfo=socket.getaddrinfo):
+        self.path = path
+        self.original_getaddrinfo = getaddrinfo
+        self.local = dict()
+        self.db = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def connection(self):
+        """sqlite connection of the current process (call with the lock held)"""
+        if self.db is None or self.pid != os.getpid():
+            # a forked process does not use the connection of its parent
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS dns (key TEXT PRIMARY KEY, answer TEXT, expires_at REAL)')
+            db.execute('DELETE FROM dns WHERE expires_at <= ?', (time.time(),))
+            db.commit()
+            self.db, self.pid = db, os.getpid()
+        return self.db
+
+    def close(self):
+        with self.lock:
+            if self.db is not None and self.pid == os.getpid():
+                self.db.close()
+            self.db = None
+
+    def get(self, key):
+        """(found, answer), answer None is a cached negative answer"""
+        now = time.time()
+        with self.lock:
+            entry = self.local.get(key)
+        if entry is not None and entry[1] > now:
+            return True, entry[0]
+        try:
+            with self.lock:
+                row = self.connection().execute(
+                    'SELECT answer, expires_at FROM dns WHERE key = ?', (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f'dns cache: {e}')
+            return False, None
+        if row is None or row[1] <= now:
+            return False, None
+        answer = json.loads(row[0])
+        with self.lock:
+            self.local[key] = (answer, row[1])
+        return True, answer
+
+    def put(self, key, answer, ttl):
+        expires_at = time.time() + min(ttl, MAX_TTL)
+        with self.lock:
+            self.local[key] = (answer, expires_at)
+        try:
+            with self.lock:
+                connection = self.connection()
+                connection.execute(
+                    'INSERT OR REPLACE INTO dns (key, answer, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(answer), expires_at)
+                )
+                connection.commit()
+        except sqlite3.Error as e:
+            print(f'dns cache: {e}')
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """socket.getaddrinfo with caching of host names"""
+        if not isinstance(host, str) or not (port is None or isinstance(port, int)) or self.is_ip(host):
+            return self.original_getaddrinfo(host, port, family, type, proto, flags)
+
+        key = f'addr {host.lower()} {int(family)} {int(type)} {proto} {flags}'
+        found, answer = self.get(key)
+        if not found:
+            try:
+                results = self.original_getaddrinfo(host, None, family, type, proto, flags)
+            except socket.gaierror as e:
+                if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+                    self.put(key, None, NEGATIVE_TTL)
+                raise
+            answer = [[int(f), int(t), p, canonname, list(sockaddr)] for f, t, p, canonname, sockaddr in results]
+            self.put(key, answer, ADDRESS_TTL)
+        if answer is None:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+
+        results = list()
+        for f, t, p, canonname, sockaddr in answer:
+            sockaddr = (sockaddr[0], port or 0) + tuple(sockaddr[2:])
+            results.append((socket.AddressFamily(f), socket.SocketKind(t), p, canonname, sockaddr))
+        return results
+
+    def resolve_mx(self, domain, lifetime=None):
+        """mail exchangers of the domain ordered by preference (empty list if there are none)"""
+        key = f'mx {domain.lower()}'
+        found, answer = self.get(key)
+        if found:
+            return answer or list()
+        try:
+            records = dns.resolver.resolve(domain, 'MX', lifetime=lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            self.put(key, None, NEGATIVE_TTL)
+            return list()
+        answer = [str(record.exchange) for record in sorted(records, key=lambda record: record.preference)]
+        self.put(key, answer, records.rrset.ttl)
+        return answer
+
+    @staticmethod
+    def is_ip(host):
+        try:
+            ipaddress.ip_address(host.strip('[]'))
+            return True
+        except ValueError:
+            return False
+
+
+def install(path=DNS_CACHE_PATH):
+    """route socket.getaddrinfo of the current process through the shared cache (once)"""
+    global _cache
+    if _cache is None:
+        _cache = DnsCache(path)
+        socket.getaddrinfo = _cache.getaddrinfo
+        # also when a pebble worker retires, atexit handlers do not run there
+        util.Finalize(None, _cache.close, exitpriority=10)
+    return _cache
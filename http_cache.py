@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urldefrag
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from url_normalize import url_normalize
+
+# the cache is off unless a directory is given, e.g. HTTP_CACHE_DIR=.http_cache
+CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', '')
+
+# seconds during which a cached response is used without asking the server
+CACHE_TTL = int(os.environ.get('HTTP_CACHE_TTL', 7 * 24 * 3600))
+
+# response headers kept together with the body
+STORED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified']
+
+
+class HttpCache(object):
+    """persistent response cache
+
+    entries are keyed by the normalized url and point to gzip-compressed bodies stored under
+    the sha256 of their content, so identical pages are stored once. stale entries are
+    revalidated with ETag / Last-Modified, an unchanged page costs a 304"""
+
+    def __init__(self, path, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.join(self.path, 'entries'), exist_ok=True)
+        os.makedirs(os.path.join(self.path, 'objects'), exist_ok=True)
+
+    def get(self, request, url, **kwargs):
+        """make a GET request with the request function, answering from the cache where possible"""
+        key = self.key(url)
+        entry = self.load(key)
+        if entry is not None:
+            if time.time() - entry['stored_at'] < self.ttl:
+                return self.response(url, entry)
+            headers = dict(kwargs.pop('headers', None) or {})
+            if entry['headers'].get('ETag'):
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+            kwargs['headers'] = headers
+
+        response = request(url, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            entry['stored_at'] = time.time()
+            self.save(key, entry)
+            return self.response(url, entry)
+        if response.status_code == 200:
+            try:
+                self.store(key, url, response)
+            except OSError as e:
+                print(f'http cache: {e}')
+        return response
+
+    @staticmethod
+    def key(url):
+        """cache key of the normalized url"""
+        url = url_normalize(urldefrag(url)[0])
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, 'entries', key[:2], key + '.json')
+
+    def object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest + '.gz')
+
+    def load(self, key):
+        """load the entry and check that its body is still there"""
+        try:
+            with open(self.entry_path(key), encoding='UTF-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.object_path(entry['digest'])):
+            return None
+        return entry
+
+    def save(self, key, entry):
+        self.write(self.entry_path(key), json.dumps(entry).encode('utf-8'))
+
+    def store_object(self, body):
+        """store the body once per content and return its digest"""
+        digest = hashlib.sha256(body).hexdigest()
+        if not os.path.exists(self.object_path(digest)):
+            self.write(self.object_path(digest), gzip.compress(body))
+        return digest
+
+    def read_object(self, digest):
+        with open(self.object_path(digest), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def store(self, key, url, response):
+        """store the body (once per content) and the entry of the url"""
+        digest = self.store_object(response.content)
+        entry = {
+            'url': url,
+            'final_url': response.url or url,
+            'digest': digest,
+            'encoding': response.encoding,
+            'headers': {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            'stored_at': time.time(),
+        }
+        self.save(key, entry)
+
+    @staticmethod
+    def write(path, data):
+        """atomic write, several worker processes share the cache"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def response(self, url, entry):
+        """build a response from the cache entry"""
+        body = self.read_object(entry['digest'])
+        response = requests.Response()
+        # the url the request was redirected to
+        response.url = entry.get('final_url', url)
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response._content = body
+        response._content_consumed = True
+        return response
+
+
+class SnapshotCache(HttpCache):
+    """rendered pages (the DOM after the scripts ran) by url, stored the same way as the responses
+
+    there is nothing to revalidate, a snapshot is used until it is older than the ttl"""
+
+    def lookup(self, url):
+        """(html, url the browser ended on) of a fresh snapshot of the url, None if there is none"""
+        entry = self.load(self.key(url))
+        if entry is None or time.time() - entry['stored_at'] >= self.ttl:
+            return None
+        try:
+            return self.read_object(entry['digest']).decode('utf-8'), entry.get('final_url') or url
+        except (OSError, ValueError) as e:
+            print(f'snapshot cache: {e}')
+            return None
+
+    def put(self, url, html, final_url=None):
+        try:
+            entry = {
+                'url': url,
+                'final_url': final_url or url,
+                'digest': self.store_object(html.encode('utf-8')),
+                'encoding': 'utf-8',
+                'headers': {'Content-Type': 'text/html; charset=utf-8'},
+                'stored_at': time.time(),
+            }
+            self.save(self.key(url), entry)
+        except OSError as e:
+            print(f'snapshot cache: {e}')
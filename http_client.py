@@ -0,0 +1,122 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import dns_cache
+from http_cache import CACHE_DIR, HttpCache
+from scheduler import HostScheduler
+from utils import CONNECT_TIMEOUT, READ_TIMEOUT
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+# number of hosts whose connections are kept alive
+POOL_CONNECTIONS = 50
+
+# number of keep-alive connections per host (should match the number of requests in flight per host)
+POOL_MAXSIZE = 10
+
+# some servers generate huge sitemaps on the fly
+SITEMAP_TIMEOUT = 60
+
+# largest page body read (bytes), the rest of a bigger page is not downloaded
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+CHUNK_SIZE = 64 * 1024
+
+_clients = dict()
+
+
+class NotHtml(Exception):
+    pass
+
+
+def check_html(url, response):
+    """raise NotHtml if the response declares a non-html content type (no content type is accepted)"""
+    content_type = response.headers.get('Content-Type', '')
+    if content_type and content_type.split(';')[0].strip().lower() not in HTML_CONTENT_TYPES:
+        response.close()
+        raise NotHtml(f'{url}: {content_type}')
+
+
+class HttpClient(object):
+    """keep-alive http client with per-host connection pools, per-host politeness and an optional persistent cache"""
+
+    def __init__(
+            self, headers=None, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, cache=None, polite=True
+    ):
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.cache = cache
+        # time budget of the domain being checked (utils.Deadline), set by the crawlers per domain
+        self.deadline = None
+
+        self.scheduler = HostScheduler(
+            self.session, user_agent=self.headers['User-Agent'], deadline=lambda: self.deadline
+        ) if polite else None
+
+    def get(self, url, html_only=False, max_bytes=None, **kwargs):
+        """make a GET request (answered from the cache where possible)
+
+        html_only: raise NotHtml for non-html responses, the body of those is not downloaded
+        max_bytes: stop reading the body after max_bytes"""
+        if self.cache is not None:
+            response = self.cache.get(self.request, url, html_only=html_only, max_bytes=max_bytes, **kwargs)
+            if html_only:
+                check_html(url, response)
+            return response
+        return self.request(url, html_only=html_only, max_bytes=max_bytes, **kwargs)
+
+    def request(self, url, html_only=False, max_bytes=None, **kwargs):
+        """make a GET request over the network, paced per host and with a timeout sized to the deadline"""
+        if self.deadline is not None:
+            self.deadline.timeout(CONNECT_TIMEOUT)
+        if self.scheduler is not None:
+            self.scheduler.wait(url)
+        if self.deadline is not None:
+            kwargs['timeout'] = self.deadline.http_timeout(kwargs.get('timeout'))
+        else:
+            kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+        if not html_only and not max_bytes:
+            return self.session.get(url, **kwargs)
+
+        # stream the body: the content type is checked before reading it and reading stops at max_bytes
+        kwargs['stream'] = True
+        response = self.session.get(url, **kwargs)
+        if html_only:
+            check_html(url, response)
+        if max_bytes:
+            body = bytearray()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                body += chunk
+                if len(body) >= max_bytes:
+                    break
+            response.close()
+            response._content = bytes(body[:max_bytes])
+            response._content_consumed = True
+        return response
+
+    def close(self):
+        """close all pooled connections"""
+        self.session.close()
+
+
+def get_client(headers=None):
+    """get the http client of the current worker process (one session per process and headers)"""
+    key = (os.getpid(), tuple(sorted((headers or {}).items())))
+    client = _clients.get(key)
+    if client is None:
+        # host names are resolved through the dns cache shared by the worker processes
+        dns_cache.install()
+        client = HttpClient(headers=headers, cache=HttpCache(CACHE_DIR) if CACHE_DIR else None)
+        _clients[key] = client
+    return client
+
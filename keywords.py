@@ -0,0 +1,52 @@
+import functools
+
+import ahocorasick
+
+
+class KeywordCounter(object):
+    """all keywords of a list counted in one pass over the text (aho-corasick automaton) instead of
+    one pass per keyword, counts(text)[word] is the same as text.count(word)"""
+
+    def __init__(self, words):
+        self.words = list(dict.fromkeys(words))
+        self.automaton = ahocorasick.Automaton()
+        for index, word in enumerate(self.words):
+            self.automaton.add_word(word, (index, len(word)))
+        if self.words:
+            self.automaton.make_automaton()
+
+    def hits(self, text):
+        """number of (non-overlapping) occurrences of every keyword, in the order of the words"""
+        hits = [0] * len(self.words)
+        if not self.words or not text:
+            return hits
+        # like str.count an occurrence of a word only counts after the end of its previous one
+        free = [0] * len(self.words)
+        for end, (index, length) in self.automaton.iter(text):
+            start = end - length + 1
+            if start >= free[index]:
+                hits[index] += 1
+                free[index] = end + 1
+        return hits
+
+    def counts(self, text):
+        """keyword -> number of occurrences in the text"""
+        return dict(zip(self.words, self.hits(text)))
+
+    def count(self, text):
+        """occurrences of all keywords in the text"""
+        return sum(self.hits(text))
+
+    def found(self, text):
+        """keywords which occur in the text, in the order of the words"""
+        return [word for word, hits in zip(self.words, self.hits(text)) if hits]
+
+
+@functools.lru_cache(maxsize=None)
+def cached_counter(words):
+    return KeywordCounter(words)
+
+
+def keyword_counter(words):
+    """counter of the keyword list, built once per list and process"""
+    return cached_counter(tuple(words))
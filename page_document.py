@@ -0,0 +1,62 @@
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
+# text of these tags is not shown by the browser
+INVISIBLE_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title', 'meta'}
+
+
+class PageDocument(object):
+    """a page parsed once for all extractors
+
+    the views of the page are computed on first use and kept: soup (the DOM), serialized (str of
+    the DOM), text (visible text), anchors ((href, lowercase text) of the links) and the first text
+    node matching a pattern. Extractors only read the DOM, they never change it"""
+
+    def __init__(self, html, url=None):
+        self.html = html or ''
+        self.url = url
+        self.views = dict()
+        self.matches = dict()
+
+    def view(self, name, build):
+        if name not in self.views:
+            self.views[name] = build()
+        return self.views[name]
+
+    @property
+    def soup(self):
+        return self.view('soup', lambda: BeautifulSoup(self.html, 'lxml'))
+
+    @property
+    def serialized(self):
+        return self.view('serialized', lambda: str(self.soup))
+
+    @property
+    def text(self):
+        return self.view('text', lambda: ' '.join(
+            node.strip() for node in self.soup.find_all(text=True)
+            # comments and the doctype are strings too, script text is one with bs4 4.9
+            if node.strip() and not isinstance(node, PreformattedString) and
+            not any(parent.name in INVISIBLE_TAGS for parent in node.parents)
+        ))
+
+    @property
+    def anchors(self):
+        return self.view('anchors', lambda: [
+            (tag.get('href'), str(tag.text).lower()) for tag in self.soup.findAll('a') if tag.get('href') is not None
+        ])
+
+    def find_text(self, pattern):
+        """first text node matching the regular expression (None if there is none)"""
+        if pattern not in self.matches:
+            self.matches[pattern] = self.soup.find(text=re.compile(pattern))
+        return self.matches[pattern]
+
+
+def page_document(page, url=None):
+    """the page as a document, html is parsed (once) into one"""
+    if isinstance(page, PageDocument):
+        return page
+    return PageDocument(page, url)
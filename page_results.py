@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# results of the all-pages checks and the sitemaps of earlier runs (an empty PAGE_RESULTS_PATH checks every page
+# and parses every sitemap every run)
+PAGE_RESULTS_PATH = os.environ.get(
+    'PAGE_RESULTS_PATH', os.path.join(tempfile.gettempdir(), 'store_identifier_pages.sqlite')
+)
+
+# stored page results older than this (seconds) are checked again even if the page did not change
+PAGE_RESULTS_TTL = int(os.environ.get('PAGE_RESULTS_TTL', 7 * 24 * 3600))
+
+# raise when the extractors change, results of the older versions are not used
+RESULTS_VERSION = 1
+
+
+def digest(text):
+    if isinstance(text, str):
+        text = text.encode('utf-8', 'replace')
+    return hashlib.sha1(text).hexdigest()
+
+
+def results_key(*inputs):
+    """hash of what the result of a page depends on besides the page: the keyword lists and RESULTS_VERSION"""
+    return digest(json.dumps([RESULTS_VERSION, inputs], sort_keys=True, default=str))
+
+
+class ResultsDatabase(object):
+    """one sqlite connection shared by the threads of a crawl (the executor threads pulling urls and the
+    event loop), closed once the results are saved. A closed database is not opened again, threads still
+    running afterwards work without it"""
+
+    schema = ''
+
+    def __init__(self, path=PAGE_RESULTS_PATH):
+        self.path = path
+        self.db = None
+        self.closed = False
+        self.db_lock = threading.RLock()
+
+    def connect(self):
+        if self.closed:
+            raise sqlite3.ProgrammingError('closed')
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute(self.schema)
+        return self.db
+
+    def execute(self, query, parameters=()):
+        """rows of the query, None if the database can not be used"""
+        with self.db_lock:
+            try:
+                return self.connect().execute(query, parameters).fetchall()
+            except sqlite3.Error as e:
+                if not self.closed:
+                    print(f'page results: {e}')
+                return None
+
+    def write(self, query, rows):
+        """run the query for all rows in one transaction"""
+        if not rows:
+            return
+        with self.db_lock:
+            try:
+                db = self.connect()
+                db.executemany(query, rows)
+                db.commit()
+            except sqlite3.Error as e:
+                if not self.closed:
+                    print(f'page results: {e}')
+
+    def close(self):
+        with self.db_lock:
+            self.closed = True
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+class PageResults(ResultsDatabase):
+    """results of the all-pages check by url, with the sitemap lastmod and the content hash of the
+    page they were taken from, so a rerun only checks what changed on the site. Results are used for
+    ttl seconds and only with the same key (results_key of the keyword lists), older ones are deleted
+
+    - lastmod in the sitemap unchanged: the page is not downloaded, the stored result is used
+    - page downloaded, content hash unchanged: the stored result is used without parsing the page
+    - otherwise the page is checked and its result stored"""
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS page_checks (tool TEXT, url TEXT, key TEXT, lastmod TEXT, digest TEXT, '
+        'result TEXT, checked_at REAL, PRIMARY KEY (tool, url))'
+    )
+
+    def __init__(self, tool, key='', path=PAGE_RESULTS_PATH, ttl=PAGE_RESULTS_TTL):
+        super().__init__(path)
+        self.tool = tool
+        self.key = key
+        self.ttl = ttl
+        self.updates = list()
+        self.not_modified = 0
+        self.same_content = 0
+        self.checked = 0
+
+    def get(self, url):
+        """(lastmod, digest, result, checked_at) stored for the url, None if the url was not checked before, with
+        another key or more than ttl seconds ago"""
+        if not self.path:
+            return None
+        rows = self.execute(
+            'SELECT lastmod, digest, result, checked_at FROM page_checks '
+            'WHERE tool = ? AND url = ? AND key = ? AND checked_at >= ?',
+            (self.tool, url, self.key, time.time() - self.ttl)
+        )
+        if not rows:
+            return None
+        return rows[0][0], rows[0][1], json.loads(rows[0][2]), rows[0][3]
+
+    def save(self):
+        """store the results of the pages checked in this run, delete the expired ones and close the database"""
+        if self.path:
+            self.write(
+                'INSERT OR REPLACE INTO page_checks (tool, url, key, lastmod, digest, result, checked_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                self.updates
+            )
+            self.write('DELETE FROM page_checks WHERE checked_at < ?', [(time.time() - self.ttl,)])
+        self.updates = list()
+        self.close()
+
+    def check_pages(self, sitemap_tree, crawler, check):
+        """results of check(text) for all pages of the sitemap: new and changed pages are downloaded
+        by the crawler and checked, the others are taken from the earlier runs"""
+        results = list()
+
+        def changed_urls():
+            for url in sitemap_tree:
+                lastmod = sitemap_tree.lastmod.get(url)
+                stored = self.get(url)
+                if stored is not None and lastmod and stored[0] == lastmod:
+                    self.not_modified += 1
+                    results.append(stored[2])
+                else:
+                    yield url
+
+        def check_page(url, response):
+            try:
+                text = response.text
+                page_digest = digest(text)
+                stored = self.get(url)
+                if stored is not None and stored[1] == page_digest:
+                    # the result keeps its age, reusing it does not make it fresh
+                    self.same_content += 1
+                    result, checked_at = stored[2], stored[3]
+                else:
+                    self.checked += 1
+                    result, checked_at = check(text), time.time()
+                results.append(result)
+                self.updates.append((
+                    self.tool, url, self.key, sitemap_tree.lastmod.get(url), page_digest,
+                    json.dumps(result, default=str), checked_at
+                ))
+            except Exception as e:
+                print(f'check_page {url}: {e}')
+
+        crawler.crawl(changed_urls(), check_page)
+        self.save()
+        return results
+
+    def report(self):
+        return f'{self.checked} checked, {self.same_content} unchanged content, {self.not_modified} not modified'
+
+
+class SitemapDigests(ResultsDatabase):
+    """content hash and parsed entries of every sitemap read, a sitemap whose content did not change since
+    the last run is not parsed again"""
+
+    schema = (
+        'CREATE TABLE IF NOT EXISTS sitemaps (url TEXT PRIMARY KEY, digest TEXT, entries TEXT, checked_at REAL)'
+    )
+
+    def __init__(self, path=PAGE_RESULTS_PATH):
+        super().__init__(path)
+        self.unchanged = 0
+
+    def entries(self, url, content_digest):
+        """entries of the sitemap stored with the same content hash, None if it is new or changed"""
+        if not self.path:
+            return None
+        rows = self.execute('SELECT digest, entries FROM sitemaps WHERE url = ?', (url,))
+        if not rows or rows[0][0] != content_digest:
+            return None
+        self.unchanged += 1
+        return [tuple(entry) for entry in json.loads(rows[0][1])]
+
+    def put(self, url, content_digest, entries):
+        if self.path:
+            self.write(
+                'INSERT OR REPLACE INTO sitemaps (url, digest, entries, checked_at) VALUES (?, ?, ?, ?)',
+                [(url, content_digest, json.dumps(entries), time.time())]
+            )
@@ -0,0 +1,62 @@
+from http_client import MAX_PAGE_BYTES
+
+
+class StoredPage(object):
+    """downloaded page (only the parts of the response the crawlers use)"""
+
+    __slots__ = ['url', 'final_url', 'status_code', 'headers', 'text']
+
+    def __init__(self, url, status_code, headers, text, final_url=None):
+        self.url = url
+        self.final_url = final_url or url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+
+class PageStore(object):
+    """per-domain page store: every url is downloaded once and all passes read the stored body
+
+    only html pages are downloaded (others raise http_client.NotHtml), bodies are cut at max_bytes"""
+
+    def __init__(self, client, max_bytes=MAX_PAGE_BYTES):
+        self.client = client
+        self.max_bytes = max_bytes
+        self.pages = dict()
+        self.errors = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, keep=True):
+        """get the page from the store or download it
+
+        keep=False is used by the last pass over the sitemap: pages that are not in the store yet
+        are not kept, so the all-pages modes do not hold the whole site in memory"""
+        if url in self.pages:
+            self.hits += 1
+            return self.pages[url]
+        if url in self.errors:
+            self.hits += 1
+            raise self.errors[url]
+
+        self.misses += 1
+        try:
+            response = self.client.get(url, html_only=True, max_bytes=self.max_bytes)
+        except Exception as e:
+            if keep:
+                self.errors[url] = e
+            raise
+        page = StoredPage(url, response.status_code, response.headers, response.text, response.url)
+        if keep:
+            self.pages[url] = page
+        return page
+
+    @property
+    def hit_ratio(self):
+        """share of requests answered from the store"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        """page store statistics"""
+        return f'{len(self.pages)} pages, {self.hits} hits, {self.misses} misses, hit ratio {self.hit_ratio:.0%}'
@@ -0,0 +1,151 @@
+import functools
+import json
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import types
+
+from selenium.webdriver.common import service
+
+# one file per running browser: the process group of chromedriver and chrome and the worker which owns it
+REGISTRY_DIR = os.path.join(tempfile.gettempdir(), 'store_identifier_browsers')
+
+# seconds between two sweeps of the main process
+SWEEP_INTERVAL = 30
+
+
+def new_process_groups():
+    """start chromedriver in a process group of its own, chrome inherits it, so a browser is
+    killed as a whole even when its worker process is gone"""
+    if not isinstance(service.subprocess.Popen, functools.partial):
+        service.subprocess = types.SimpleNamespace(
+            Popen=functools.partial(subprocess.Popen, start_new_session=True)
+        )
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def group_members(pgid):
+    """pids of the process group which belong to a browser (chromedriver or chrome)"""
+    members = list()
+    try:
+        names = os.listdir('/proc')
+    except OSError:
+        return members
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                stat = f.read().rsplit(')', 1)[1].split()
+            if int(stat[2]) != pgid:
+                continue
+            with open(f'/proc/{name}/cmdline', 'rb') as f:
+                cmdline = f.read().decode('utf-8', 'replace').lower()
+        except (OSError, IndexError, ValueError):
+            continue
+        # the group id may have been reused by an unrelated process since the browser was registered
+        if 'chrom' in cmdline:
+            members.append(int(name))
+    return members
+
+
+def kill_group(pgid):
+    """kill what is left of the browser group, return the number of processes"""
+    members = group_members(pgid)
+    if members:
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    return len(members)
+
+
+def register(pgid):
+    """remember the browser group of the current worker process"""
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    with open(os.path.join(REGISTRY_DIR, f'{pgid}.json'), 'w') as f:
+        json.dump({'pgid': pgid, 'owner': os.getpid(), 'started_at': time.time()}, f)
+
+
+def unregister(pgid):
+    """kill the rest of a browser which was quit and forget it"""
+    kill_group(pgid)
+    try:
+        os.remove(os.path.join(REGISTRY_DIR, f'{pgid}.json'))
+    except OSError:
+        pass
+
+
+class Reaper(object):
+    """kills the browsers of worker processes which do not exist any more (killed on a task timeout,
+    replaced by the pool) and counts them"""
+
+    def __init__(self, interval=SWEEP_INTERVAL):
+        self.interval = interval
+        self.groups = 0
+        self.processes = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def sweep(self):
+        """kill the orphaned browsers, return the number of processes killed"""
+        try:
+            names = os.listdir(REGISTRY_DIR)
+        except OSError:
+            return 0
+        killed = 0
+        for name in names:
+            path = os.path.join(REGISTRY_DIR, name)
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if alive(entry['owner']):
+                continue
+            processes = kill_group(entry['pgid'])
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            if processes:
+                print(f'reaper: killed {processes} browser processes of worker {entry["owner"]}')
+                with self.lock:
+                    self.groups += 1
+                    self.processes += processes
+                killed += processes
+        return killed
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sweep()
+
+    def start(self):
+        """sweep in the background every interval seconds"""
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """stop the background sweeps and sweep a last time"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.sweep()
+
+    def report(self):
+        """leaked browsers found so far"""
+        return f'{self.groups} leaked browsers, {self.processes} processes killed'
@@ -0,0 +1,579 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import util
+from multiprocessing.connection import Client
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import reaper
+from http_cache import SnapshotCache
+from page_document import PageDocument
+from utils import PAGE_LOAD_TIMEOUT
+
+# warm browsers per worker process
+POOL_SIZE = 1
+
+# tabs per browser of the render service (render_service.RenderService), the crawl workers render one
+# page at a time and always use a browser of their own
+RENDER_TABS = int(os.environ.get('RENDER_TABS', 1))
+
+# a browser is replaced after this many renders or when chrome and chromedriver use more memory (bytes)
+MAX_RENDERS = 50
+MAX_RSS = 1024 * 1024 * 1024
+
+# set by render_service.RenderService for the crawl workers it serves
+SERVICE_ADDRESS = 'RENDER_SERVICE_ADDRESS'
+SERVICE_KEY = 'RENDER_SERVICE_KEY'
+
+# longest wait for the render service (queue and render) without a deadline, and for its answer after it
+SERVICE_TIMEOUT = 300
+SERVICE_SLACK = 5
+
+# rendered pages are kept for retries and for the other tool (an empty RENDER_CACHE_DIR switches it off)
+SNAPSHOT_DIR = os.environ.get('RENDER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'store_identifier_renders'))
+SNAPSHOT_TTL = int(os.environ.get('RENDER_CACHE_TTL', 24 * 3600))
+
+# longest wait for the scripts of the page after it has loaded (seconds)
+RENDER_WAIT = 5
+
+# the page is settled when nothing was downloaded and the DOM did not change for these periods (seconds)
+NETWORK_IDLE = 0.5
+DOM_QUIET = 0.5
+
+POLL_INTERVAL = 0.1
+
+# installs a mutation observer and counters of running XHR / fetch requests once per page,
+# returns the state of the page (times in milliseconds of performance.now())
+RENDER_PROBE = """
+if (!window.__renderProbe) {
+    var probe = window.__renderProbe = {lastMutation: performance.now(), pending: 0};
+    new MutationObserver(function () { probe.lastMutation = performance.now(); }).observe(
+        document, {childList: true, subtree: true, attributes: true, characterData: true}
+    );
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        probe.pending++;
+        this.addEventListener('loadend', function () { probe.pending--; });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            probe.pending++;
+            return fetch.apply(this, arguments).finally(function () { probe.pending--; });
+        };
+    }
+}
+var lastResponse = performance.getEntriesByType('resource').reduce(function (last, entry) {
+    return Math.max(last, entry.responseEnd);
+}, 0);
+return {
+    readyState: document.readyState, now: performance.now(), lastMutation: window.__renderProbe.lastMutation,
+    lastResponse: lastResponse, pending: window.__renderProbe.pending, href: location.href,
+    stale: !!window.__renderStale
+};
+"""
+
+# marks the document a tab shows before a navigation, the probe answers from it until the new page is committed
+MARK_STALE = 'window.__renderStale = true;'
+
+# resource types the renders do not download (comma separated, e.g. RENDER_BLOCK_TYPES=image,font,media),
+# the page source does not depend on them
+BLOCK_TYPES = os.environ.get('RENDER_BLOCK_TYPES', 'image,font,media').split(',')
+
+# hosts of analytics, ads and tracking scripts which are not downloaded (with their subdomains)
+BLOCK_HOSTS = os.environ.get('RENDER_BLOCK_HOSTS', ','.join([
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'facebook.net', 'hotjar.com', 'clarity.ms',
+    'bing.com', 'linkedin.com', 'ads-twitter.com', 'criteo.com', 'taboola.com', 'outbrain.com'
+])).split(',')
+
+# devtools can block by url only, resource types are blocked by their file extensions
+RESOURCE_TYPE_EXTENSIONS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp', 'tif', 'tiff'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'media': ['mp4', 'webm', 'ogg', 'ogv', 'mp3', 'wav', 'm4a', 'mov', 'avi'],
+    'stylesheet': ['css'],
+}
+
+# a statically downloaded page with less visible text than this (characters) is rendered
+MIN_TEXT_LENGTH = 200
+
+# empty mount points of single page applications (react, vue, next, nuxt, gatsby, angular, angularjs)
+SPA_ROOT = re.compile(
+    r'<div[^>]*\bid=["\']?(root|app|__next|__nuxt|___gatsby)(?![\w-])[^>]*>\s*</div>'
+    r'|<app-root[^>]*>\s*</app-root>|<[^>]+\sng-app[\s=>]',
+    re.I
+)
+
+# a main page without any of these in its visible text or its links has most likely not been built yet
+CONTACT_WORDS = ['kontakt', 'contact', 'impressum']
+CONTACT_LINKS = ('mailto:', 'tel:')
+EMAIL = re.compile(r'[\w.+-]+@[\w-]+(\.[\w-]+)*\.[a-z]{2,}', re.I)
+
+_pools = dict()
+_snapshots = None
+
+
+class RenderFailed(Exception):
+    pass
+
+
+def origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def blocked_urls(types=None, hosts=None):
+    """url patterns for Network.setBlockedURLs"""
+    types = BLOCK_TYPES if types is None else types
+    hosts = BLOCK_HOSTS if hosts is None else hosts
+    patterns = list()
+    for resource_type in types:
+        for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type.strip(), list()):
+            patterns.append(f'*.{extension}')
+            patterns.append(f'*.{extension}?*')
+    for host in hosts:
+        host = host.strip()
+        if host:
+            patterns.append(f'*://{host}/*')
+            patterns.append(f'*://*.{host}/*')
+    return patterns
+
+
+def process_tree_rss(pid):
+    """resident memory of the process and all its descendants in bytes (linux /proc, 0 elsewhere)"""
+    children = dict()
+    rss = dict()
+    try:
+        for name in os.listdir('/proc'):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{name}/stat') as f:
+                    stat = f.read().rsplit(')', 1)[1].split()
+                children.setdefault(int(stat[1]), list()).append(int(name))
+                rss[int(name)] = int(stat[21]) * os.sysconf('SC_PAGE_SIZE')
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        return 0
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, list()))
+    return total
+
+
+def settled(state):
+    """the page is complete, no request is running and neither the network nor the DOM changed lately"""
+    return state['readyState'] == 'complete' and state['pending'] <= 0 and \
+        state['now'] - state['lastResponse'] >= NETWORK_IDLE * 1000 and \
+        state['now'] - state['lastMutation'] >= DOM_QUIET * 1000
+
+
+def navigated(state):
+    """the state is of the page being loaded, not of the blank (or previous) document of the tab"""
+    return state['href'] != 'about:blank' and not state['stale']
+
+
+def wait_until_settled(driver, timeout=RENDER_WAIT):
+    """wait until the page is settled (document complete, network idle, DOM quiet) but no longer
+    than timeout, return the seconds waited"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            if settled(driver.execute_script(RENDER_PROBE)):
+                break
+        except Exception:  # noqa (e.g. the page navigates away)
+            pass
+        time.sleep(min(POLL_INTERVAL, max(0.0, timeout - (time.monotonic() - started))))
+    return time.monotonic() - started
+
+
+class Browser(object):
+    """warm headless chrome which does not download images, fonts, media and trackers"""
+
+    def __init__(self, block_types=None, block_hosts=None, tabs=False):
+        block_types = BLOCK_TYPES if block_types is None else block_types
+        chrome_options = webdriver.ChromeOptions()
+        chrome_options.headless = True
+        if 'image' in block_types:
+            # also covers images without a file extension and css backgrounds
+            chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        if tabs:
+            # driver.get returns as soon as the navigation starts, tabs in the background run at full speed
+            chrome_options.set_capability('pageLoadStrategy', 'none')
+            chrome_options.add_argument('--disable-background-timer-throttling')
+            chrome_options.add_argument('--disable-backgrounding-occluded-windows')
+            chrome_options.add_argument('--disable-renderer-backgrounding')
+        reaper.new_process_groups()
+        self.driver = webdriver.Chrome('chromedriver', chrome_options=chrome_options)
+        # chromedriver leads the process group of the browser
+        self.group = self.driver.service.process.pid
+        reaper.register(self.group)
+        self.renders = 0
+        self.origins = set()
+        self.blocked = blocked_urls(block_types, block_hosts)
+        self.block()
+
+    def block(self):
+        """requests of the current tab matching the blocklist fail at once instead of being downloaded"""
+        if self.blocked:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked})
+
+    def open_tab(self):
+        """open a blank tab and return its window handle"""
+        handles = set(self.driver.window_handles)
+        self.driver.execute_script('window.open("about:blank", "_blank")')
+        handle = (set(self.driver.window_handles) - handles).pop()
+        self.driver.switch_to.window(handle)
+        self.block()
+        return handle
+
+    def rss(self):
+        """memory of chromedriver and the chrome processes it started"""
+        return process_tree_rss(self.driver.service.process.pid)
+
+    def reset(self):
+        """forget everything the previous domain left: extra windows, cookies, storage and cache"""
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+        self.driver.get('about:blank')
+        self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        self.driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        for page_origin in self.origins:
+            self.driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': page_origin, 'storageTypes': 'all'})
+        self.origins = set()
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f'browser quit: {e}')
+        reaper.unregister(self.group)
+
+
+class BrowserPool(object):
+    """fixed number of warm browsers of one worker process, handed out per render
+
+    the state of a browser is reset after every render, a browser is recycled after max_renders
+    renders or when it grows beyond max_rss"""
+
+    def __init__(self, size=POOL_SIZE, max_renders=MAX_RENDERS, max_rss=MAX_RSS):
+        self.size = size
+        self.max_renders = max_renders
+        self.max_rss = max_rss
+        self.idle = list()
+        self.started = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def browser(self):
+        """take a browser for one render (waits while all browsers are busy)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.idle or self.started < self.size)
+            if self.idle:
+                browser = self.idle.pop()
+            else:
+                self.started += 1
+                browser = None
+        if browser is None:
+            try:
+                browser = Browser()
+            except Exception:
+                self.discard(None)
+                raise
+
+        try:
+            yield browser
+        finally:
+            # a failed render (e.g. a page load timeout) does not mean the browser is broken,
+            # the reset tells whether it still works
+            browser.renders += 1
+            if browser.renders < self.max_renders and self.release(browser):
+                with self.condition:
+                    self.idle.append(browser)
+                    self.condition.notify()
+            else:
+                self.discard(browser)
+
+    def release(self, browser):
+        """reset the browser for the next domain, False if it should be recycled"""
+        try:
+            if self.max_rss and browser.rss() > self.max_rss:
+                return False
+            browser.reset()
+            return True
+        except Exception as e:
+            print(f'browser reset: {e}')
+            return False
+
+    def discard(self, browser):
+        """quit the browser, a new one is started on demand"""
+        if browser is not None:
+            browser.quit()
+        with self.condition:
+            self.started -= 1
+            self.condition.notify()
+
+    def render(self, url, deadline=None):
+        """html of the page once it has settled (at most RENDER_WAIT seconds after the load) and the url
+        the browser ended on after the redirects"""
+        with self.browser() as browser:
+            browser.origins.add(origin(url))
+            browser.driver.set_page_load_timeout(
+                deadline.timeout(PAGE_LOAD_TIMEOUT) if deadline else PAGE_LOAD_TIMEOUT
+            )
+            browser.driver.get(url)
+            browser.origins.add(origin(browser.driver.current_url))
+            timeout = min(RENDER_WAIT, deadline.remaining()) if deadline else RENDER_WAIT
+            waited = wait_until_settled(browser.driver, timeout)
+            print(f'render {url}: settled after {waited:.1f}s, saved {RENDER_WAIT - waited:.1f}s')
+            # scripts may have moved on after the load (e.g. a language redirect)
+            final_url = browser.driver.current_url
+            browser.origins.add(origin(final_url))
+            return browser.driver.page_source, final_url
+
+    def close(self):
+        """quit the idle browsers"""
+        with self.condition:
+            idle, self.idle = self.idle, list()
+            self.started -= len(idle)
+        for browser in idle:
+            browser.quit()
+
+
+def has_contacts(document):
+    """the page shows contact words or an email address, or links to one (mailto:, tel:, contact pages)"""
+    text = document.text.lower()
+    if any(word in text for word in CONTACT_WORDS) or EMAIL.search(text):
+        return True
+    for link, _ in document.anchors:
+        link = link.strip().lower()
+        if link.startswith(CONTACT_LINKS) or any(word in link for word in CONTACT_WORDS):
+            return True
+    return False
+
+
+def needs_rendering(html):
+    """reason why the statically downloaded page has to be rendered by the browser, '' if it is complete
+
+    only the visible text counts: inline scripts, styles and json-ld of a page built by scripts are not content"""
+    if not html or not html.strip():
+        return 'empty page'
+    if SPA_ROOT.search(html):
+        return 'single page application'
+    document = PageDocument(html)
+    if len(document.text) < MIN_TEXT_LENGTH:
+        return 'empty body'
+    if not document.anchors:
+        return 'no links'
+    if not has_contacts(document):
+        return 'no contacts'
+    return ''
+
+
+def get_main_page(pages, url, deadline=None):
+    """the main page (a PageDocument) and the path it took: 'static' when the plain download is enough,
+    'rendered' when the page needs the browser (scripts build the content, the download failed)
+
+    the url of the document is the one the redirects ended on (e.g. https://www.x.ch/de/), of the download or
+    of the browser for a rendered page, relative links of the page are resolved against it"""
+    try:
+        page = pages.get(url)
+        reason = needs_rendering(page.text) if page.status_code == 200 else f'status {page.status_code}'
+    except Exception as e:
+        reason = f'download failed ({e})'
+    if not reason:
+        print(f'main page {url}: static')
+        return PageDocument(page.text, page.final_url), 'static'
+    print(f'main page {url}: rendered, {reason}')
+    html, final_url = render(url, deadline)
+    return PageDocument(html, final_url), 'rendered'
+
+
+def render(url, deadline=None):
+    """rendered html of the page and the url the browser ended on, a fresh snapshot of an earlier render
+    (a retry, the other tool) is used instead of the browser"""
+    snapshots = get_snapshot_cache()
+    if snapshots is not None:
+        snapshot = snapshots.lookup(url)
+        if snapshot is not None:
+            print(f'render {url}: snapshot')
+            return snapshot
+    if os.environ.get(SERVICE_ADDRESS):
+        html, final_url = render_remote(url, deadline)
+    else:
+        html, final_url = get_browser_pool().render(url, deadline)
+    if snapshots is not None:
+        snapshots.put(url, html, final_url)
+    return html, final_url
+
+
+class TabBrowser(object):
+    """one headless chrome rendering several pages at once, one tab per page
+
+    pages are loaded without waiting for them (page load strategy "none"), the webdriver session only
+    switches to a tab to start the load, to probe the state and to read the source. So loading, scripts
+    and layout of all tabs run in parallel inside chrome while the threads calling render() wait for
+    their own tab. The browser is recycled once no tab is busy after max_renders renders or when it
+    grows beyond max_rss"""
+
+    def __init__(self, tabs=RENDER_TABS, max_renders=MAX_RENDERS, max_rss=MAX_RSS):
+        self.tabs = tabs
+        self.max_renders = max_renders
+        self.max_rss = max_rss
+        self.browser = None
+        self.idle = list()
+        self.busy = 0
+        self.retiring = False
+        # webdriver commands of all tabs go through one session, one command at a time
+        self.lock = threading.RLock()
+        self.condition = threading.Condition()
+
+    def take(self):
+        """a free tab (waits while all tabs are busy or the browser is being recycled)"""
+        with self.condition:
+            self.condition.wait_for(lambda: not self.retiring and (self.idle or self.browser is None))
+            if self.browser is None:
+                browser = Browser(tabs=True)
+                with self.lock:
+                    self.idle = [browser.driver.current_window_handle] + \
+                        [browser.open_tab() for _ in range(self.tabs - 1)]
+                self.browser = browser
+            self.busy += 1
+            return self.idle.pop()
+
+    def release(self, tab, origins):
+        """blank the tab and forget the data of the pages it showed, recycle the browser when it is due"""
+        browser = self.browser
+        try:
+            with self.lock:
+                browser.driver.switch_to.window(tab)
+                browser.driver.get('about:blank')
+                for page_origin in origins:
+                    browser.driver.execute_cdp_cmd(
+                        'Storage.clearDataForOrigin', {'origin': page_origin, 'storageTypes': 'all'}
+                    )
+            broken = False
+        except Exception as e:
+            print(f'tab reset: {e}')
+            broken = True
+
+        with self.condition:
+            browser.renders += 1
+            self.busy -= 1
+            self.idle.append(tab)
+            if broken or browser.renders >= self.max_renders or (self.max_rss and browser.rss() > self.max_rss):
+                # no new renders start, the last busy tab quits the browser
+                self.retiring = True
+            if self.retiring and not self.busy:
+                browser.quit()
+                self.browser = None
+                self.idle = list()
+                self.retiring = False
+            self.condition.notify_all()
+
+    def command(self, tab, method, *args):
+        """webdriver command in the tab"""
+        with self.lock:
+            self.browser.driver.switch_to.window(tab)
+            return getattr(self.browser.driver, method)(*args)
+
+    def render(self, url, deadline=None):
+        """html of the page once it has settled (at most RENDER_WAIT seconds after the load) and the url
+        the tab ended on after the redirects"""
+        tab = self.take()
+        origins = {origin(url)}
+        try:
+            load_timeout = deadline.timeout(PAGE_LOAD_TIMEOUT) if deadline else PAGE_LOAD_TIMEOUT
+            started = time.monotonic()
+            try:
+                self.command(tab, 'execute_script', MARK_STALE)
+            except WebDriverException:  # noqa (the tab is still being blanked, the href tells)
+                pass
+            # get returns before the navigation is committed, until then the probe runs in the old document
+            # (about:blank is complete at once), the load timeout covers the wait for the commit too
+            self.command(tab, 'get', url)
+            loaded = None
+            while True:
+                try:
+                    state = self.command(tab, 'execute_script', RENDER_PROBE)
+                except WebDriverException:  # noqa (the document is being replaced)
+                    state = None
+                if state is not None and not navigated(state):
+                    state = None
+                now = time.monotonic()
+                if loaded is None and state is not None and state['readyState'] == 'complete':
+                    loaded = now
+                if loaded is None and now - started > load_timeout:
+                    raise TimeoutException(f'page load timeout {load_timeout:.0f}s')
+                if loaded is not None:
+                    wait = min(RENDER_WAIT, deadline.remaining()) if deadline else RENDER_WAIT
+                    if (state is not None and settled(state)) or now - loaded >= wait:
+                        break
+                time.sleep(POLL_INTERVAL)
+            with self.lock:
+                self.browser.driver.switch_to.window(tab)
+                final_url = self.browser.driver.current_url
+                origins.add(origin(final_url))
+                html = self.browser.driver.page_source
+            print(f'render {url}: loaded after {loaded - started:.1f}s, settled after {now - loaded:.1f}s')
+            return html, final_url
+        finally:
+            self.release(tab, origins)
+
+    def close(self):
+        """quit the browser once no tab is busy"""
+        with self.condition:
+            if self.browser is not None and not self.busy:
+                self.browser.quit()
+                self.browser = None
+                self.idle = list()
+
+
+def render_remote(url, deadline=None):
+    """render the page in the render service (waits while its queue is full), (html, url the browser ended on)"""
+    timeout = deadline.timeout(SERVICE_TIMEOUT) if deadline else SERVICE_TIMEOUT
+    with Client(os.environ[SERVICE_ADDRESS], family='AF_UNIX', authkey=bytes.fromhex(os.environ[SERVICE_KEY])) as connection:  # noqa
+        connection.send({'url': url, 'timeout': timeout})
+        if not connection.poll(timeout + SERVICE_SLACK):
+            raise RenderFailed(f'no answer from the render service in {timeout:.0f}s')
+        answer = connection.recv()
+    if 'error' in answer:
+        raise RenderFailed(answer['error'])
+    return answer['html'], answer['url']
+
+
+def get_snapshot_cache():
+    """snapshot cache shared by the worker processes and both tools, None if it is switched off"""
+    global _snapshots
+    if _snapshots is None and SNAPSHOT_DIR:
+        _snapshots = SnapshotCache(SNAPSHOT_DIR, SNAPSHOT_TTL)
+    return _snapshots
+
+
+def get_browser_pool():
+    """browser pool of the current worker process (a worker renders one page at a time, tabs would stay unused)"""
+    pool = _pools.get(os.getpid())
+    if pool is None:
+        pool = BrowserPool()
+        _pools[os.getpid()] = pool
+        # pebble workers leave through os._exit, atexit handlers never run there; multiprocessing finalizers
+        # run when a worker retires (max_tasks) and at the exit of the main process
+        util.Finalize(None, pool.close, exitpriority=10)
+    return pool
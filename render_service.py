@@ -0,0 +1,152 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+from multiprocessing import Event, Process
+from multiprocessing.connection import Client, Listener
+
+from render import BrowserPool, RENDER_TABS, SERVICE_ADDRESS, SERVICE_KEY, TabBrowser
+from utils import Deadline
+
+# renders at the same time in the service, 0 renders inside every crawl worker as before. With RENDER_TABS > 1
+# they are tabs: RENDER_WORKERS renders need RENDER_WORKERS / RENDER_TABS browsers (rounded up)
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 0))
+
+# jobs waiting for a free browser, crawl workers wait when the queue is full
+QUEUE_SIZE = int(os.environ.get('RENDER_QUEUE_SIZE', 20))
+
+
+class RenderJob(object):
+    __slots__ = ['connection', 'url', 'deadline', 'queued_at']
+
+    def __init__(self, connection, url, timeout):
+        self.connection = connection
+        self.url = url
+        self.deadline = Deadline(timeout)
+        self.queued_at = time.monotonic()
+
+
+class RenderService(object):
+    """rendering in a process of its own, sized independently of the crawl workers
+
+    crawl workers send (url, seconds) over a unix socket and wait for the html. Jobs go through a
+    bounded queue to `workers` render threads, a full queue holds the senders back until their
+    time is spent (backpressure), jobs whose time ran out in the queue are not rendered"""
+
+    def __init__(self, workers=RENDER_WORKERS, queue_size=QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.address = os.path.join(tempfile.gettempdir(), f'store_identifier_render_{os.getpid()}.sock')
+        self.key = os.urandom(16)
+        self.ready = Event()
+        self.process = None
+
+    def start(self):
+        """start the service process, crawl workers forked afterwards send their renders to it"""
+        self.process = Process(target=self.serve, daemon=True)
+        self.process.start()
+        self.ready.wait()
+        os.environ[SERVICE_ADDRESS] = self.address
+        os.environ[SERVICE_KEY] = self.key.hex()
+
+    def stop(self):
+        """let the service quit its browsers and exit"""
+        os.environ.pop(SERVICE_ADDRESS, None)
+        os.environ.pop(SERVICE_KEY, None)
+        if self.process is not None:
+            try:
+                with Client(self.address, family='AF_UNIX', authkey=self.key) as connection:
+                    connection.send({'stop': True})
+            except OSError as e:
+                print(f'render service stop: {e}')
+            self.process.join(60)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+    def serve(self):
+        """service process: accept jobs and render them"""
+        if RENDER_TABS > 1:
+            # render thread i uses browser i // RENDER_TABS, no browser gets more renders than it has tabs
+            per_pool = RENDER_TABS
+            pools = [
+                TabBrowser(tabs=min(RENDER_TABS, self.workers - first)) for first in range(0, self.workers, RENDER_TABS)
+            ]
+        else:
+            per_pool = max(1, self.workers)
+            pools = [BrowserPool(size=self.workers)]
+        jobs = queue.Queue(self.queue_size)
+        stats = {'rendered': 0, 'failed': 0, 'expired': 0, 'rejected': 0, 'queue_wait': 0.0}
+        lock = threading.Lock()
+
+        def reply(job, answer, outcome):
+            with lock:
+                stats[outcome] += 1
+            try:
+                job.connection.send(answer)
+            except OSError:
+                pass
+            job.connection.close()
+
+        def work(pool):
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                with lock:
+                    stats['queue_wait'] = max(stats['queue_wait'], time.monotonic() - job.queued_at)
+                if job.deadline.expired():
+                    reply(job, {'error': 'time ran out in the render queue'}, 'expired')
+                    continue
+                try:
+                    html, final_url = pool.render(job.url, job.deadline)
+                    reply(job, {'html': html, 'url': final_url}, 'rendered')
+                except Exception as e:
+                    reply(job, {'error': f'{type(e).__name__}: {e}'}, 'failed')
+
+        def enqueue(job):
+            try:
+                # blocks while the browsers are busy and the queue is full
+                jobs.put(job, timeout=job.deadline.remaining())
+            except queue.Full:
+                reply(job, {'error': 'render queue full'}, 'rejected')
+
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        listener = Listener(self.address, family='AF_UNIX', authkey=self.key)
+        threads = [
+            threading.Thread(target=work, args=(pools[index // per_pool],), daemon=True) for index in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        self.ready.set()
+
+        while True:
+            try:
+                connection = listener.accept()
+                # clients send the job right after connecting
+                message = connection.recv() if connection.poll(5) else dict()
+            except Exception as e:  # noqa (e.g. a client with a wrong key or gone)
+                print(f'render service: {e}')
+                continue
+            if message.get('stop'):
+                connection.close()
+                break
+            if 'url' not in message:
+                connection.close()
+                continue
+            job = RenderJob(connection, message['url'], message['timeout'])
+            threading.Thread(target=enqueue, args=(job,), daemon=True).start()
+
+        for _ in threads:
+            jobs.put(None)
+        for thread in threads:
+            thread.join()
+        for pool in pools:
+            pool.close()
+        listener.close()
+        print(
+            f"render service: {stats['rendered']} rendered, {stats['failed']} failed, {stats['expired']} expired, "
+            f"{stats['rejected']} rejected, longest queue wait {stats['queue_wait']:.1f}s"
+        )
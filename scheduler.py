@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from protego import Protego
+
+# default pace for hosts without Crawl-delay: requests per second and burst size. A domain is crawled from one
+# host, so this caps the all-pages scan of a domain whatever the crawl concurrency (e.g. HOST_RATE=20 HOST_BURST=40
+# scans faster and is harder on small servers)
+HOST_RATE = float(os.environ.get('HOST_RATE', 4.0))
+HOST_BURST = int(os.environ.get('HOST_BURST', 8))
+
+# some robots.txt ask for minutes between requests, a domain would never finish
+MAX_CRAWL_DELAY = 60
+
+ROBOTS_TIMEOUT = 10
+
+
+class TokenBucket(object):
+    """token bucket, reservations beyond the burst are queued (tokens go negative)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """take one token and return the seconds until it may be used"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostScheduler(object):
+    """per-host politeness: robots.txt is read once per host, Crawl-delay is honored and every host
+    gets its own token bucket, so many hosts can be crawled at full speed without hammering one"""
+
+    def __init__(self, session, user_agent='*', rate=HOST_RATE, burst=HOST_BURST, deadline=None):
+        self.session = session
+        self.user_agent = user_agent
+        # returns the time budget (utils.Deadline) of the domain being checked, None if there is none
+        self.deadline = deadline
+        self.rate = rate
+        self.burst = burst
+        self.buckets = dict()
+        self.host_locks = dict()
+        self.prepaid = dict()
+        self.robots = dict()
+        self.lock = threading.Lock()
+
+    def reserve(self, url):
+        """take the slot of the url in advance and return the seconds until it is due
+        (the next wait() for this url returns at once)"""
+        bucket = self.bucket(url)
+        with self.lock:
+            self.prepaid[url] = self.prepaid.get(url, 0) + 1
+            return bucket.reserve()
+
+    def wait(self, url):
+        """block until the host of the url may be requested"""
+        with self.lock:
+            if self.prepaid.get(url):
+                self.prepaid[url] -= 1
+                if not self.prepaid[url]:
+                    del self.prepaid[url]
+                return
+        bucket = self.bucket(url)
+        with self.lock:
+            delay = bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, url):
+        """drop a reservation which was not used (e.g. the page came from a cache)"""
+        with self.lock:
+            if self.prepaid.get(url):
+                self.prepaid[url] -= 1
+            if not self.prepaid.get(url):
+                self.prepaid.pop(url, None)
+
+    def bucket(self, url):
+        """token bucket of the host (robots.txt is downloaded on the first request to the host)"""
+        parts = urlsplit(url)
+        host = parts.netloc
+        with self.lock:
+            if host in self.buckets:
+                return self.buckets[host]
+            host_lock = self.host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            if host not in self.buckets:
+                robots_url = f'{parts.scheme}://{host}/robots.txt'
+                parser = self.fetch_robots(robots_url)
+                interval = self.crawl_delay(parser) if parser is not None else 0
+                if interval:
+                    bucket = TokenBucket(1 / interval, 1)
+                else:
+                    bucket = TokenBucket(self.rate, self.burst)
+                with self.lock:
+                    self.robots[host] = parser
+                    self.buckets[host] = bucket
+        return self.buckets[host]
+
+    def fetch_robots(self, robots_url):
+        """parsed robots.txt, None if there is none
+
+        raises utils.DeadlineExceeded when the budget of the domain is spent (robots.txt of the host is
+        then read with the next request instead of being taken as missing)"""
+        deadline = self.deadline() if self.deadline is not None else None
+        timeout = deadline.http_timeout(ROBOTS_TIMEOUT) if deadline is not None else ROBOTS_TIMEOUT
+        try:
+            response = self.session.get(robots_url, timeout=timeout)
+            if response.status_code != 200:
+                return None
+            # protego, unlike urllib.robotparser, understands fractional Crawl-delay values
+            return Protego.parse(response.text)
+        except Exception as e:
+            print(f'robots.txt: {e}')
+            return None
+
+    def crawl_delay(self, parser):
+        """seconds between requests asked by robots.txt (Crawl-delay or Request-rate)"""
+        try:
+            delay = float(parser.crawl_delay(self.user_agent) or 0)
+            request_rate = parser.request_rate(self.user_agent)
+            if request_rate and request_rate.requests:
+                delay = max(delay, request_rate.seconds / request_rate.requests)
+            return min(delay, MAX_CRAWL_DELAY)
+        except Exception as e:
+            print(f'crawl_delay: {e}')
+            return 0
+
+    def sitemaps(self, url):
+        """sitemaps listed in robots.txt of the host of the url (read once with the crawl delay)"""
+        self.bucket(url)
+        parser = self.robots.get(urlsplit(url).netloc)
+        return list(parser.sitemaps) if parser is not None else list()
@@ -0,0 +1,253 @@
+import codecs
+import gzip
+import io
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from lxml import etree
+from protego import Protego
+
+from http_client import SITEMAP_TIMEOUT
+from page_results import SitemapDigests, digest
+from utils import DeadlineExceeded
+
+# places of sitemaps which are not listed in robots.txt (the ones usp tries)
+SITEMAP_PATHS = [
+    'sitemap.xml', 'sitemap.xml.gz', 'sitemap_index.xml', 'sitemap-index.xml', 'sitemap_index.xml.gz',
+    'sitemap-index.xml.gz', '.sitemap.xml', 'sitemap', 'admin/config/search/xmlsitemap', 'sitemap/sitemap-index.xml'
+]
+
+# sitemaps downloaded and parsed at the same time (the host scheduler still paces the requests)
+SITEMAP_CONCURRENCY = 8
+
+# sitemap indexes pointing to sitemap indexes are followed this deep
+MAX_DEPTH = 10
+
+# largest sitemap read after decompression (bytes)
+MAX_SITEMAP_BYTES = 100 * 1024 * 1024
+
+# urls taken from the sitemaps of a domain, 0 takes all (e.g. SITEMAP_MAX_URLS=50000 for huge shops)
+MAX_SITEMAP_URLS = int(os.environ.get('SITEMAP_MAX_URLS', 0))
+
+XML_PARSER = etree.XMLParser(recover=True, huge_tree=True, resolve_entities=False, no_network=True)
+
+
+def homepage(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}/'
+
+
+def canonical_homepages(urls, pages):
+    """homepages of the sites behind the urls: every url is requested once (the page store follows
+    the redirects) and urls which end on the same host share one sitemap discovery"""
+    groups = dict()
+    for url in urls:
+        try:
+            final_url = pages.get(url).final_url
+        except Exception as e:
+            print(f'canonical_homepages {url}: {e}')
+            final_url = url
+        groups.setdefault(homepage(final_url), list()).append(url)
+    for site, members in groups.items():
+        if len(members) > 1:
+            print(f'sitemap {site}: one discovery for {members}')
+    return list(groups)
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower() if isinstance(tag, str) else ''
+
+
+def child_text(element, name):
+    for child in element:
+        if local_name(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+
+def parse_sitemap(content):
+    """(kind, url, lastmod) of a sitemap: kind 'sitemap' for the children of an index, 'page' for pages
+
+    xml sitemaps, sitemap indexes, rss and atom feeds and plain text sitemaps are understood,
+    lastmod is None where the sitemap does not tell it. Like usp the kind is told by the content,
+    not by the content type (text sitemaps are often served as application/octet-stream or untyped)"""
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.GzipFile(fileobj=io.BytesIO(content)).read(MAX_SITEMAP_BYTES)
+    if content.startswith(codecs.BOM_UTF8):
+        content = content[len(codecs.BOM_UTF8):]
+    if content.lstrip()[:1] == b'<':
+        try:
+            root = etree.fromstring(content, XML_PARSER)
+        except etree.XMLSyntaxError:
+            return
+        if root is None:
+            return
+        for element in root.iter():
+            name = local_name(element.tag)
+            if name in ('url', 'sitemap'):
+                location = child_text(element, 'loc')
+                if location:
+                    yield 'sitemap' if name == 'sitemap' else 'page', location, child_text(element, 'lastmod')
+            elif name == 'item':
+                location = child_text(element, 'link')
+                if location:
+                    yield 'page', location, child_text(element, 'pubdate')
+            elif name == 'entry':
+                for child in element:
+                    if local_name(child.tag) == 'link' and child.get('href'):
+                        yield 'page', child.get('href').strip(), child_text(element, 'updated')
+    else:
+        for line in content.decode('utf-8', 'replace').splitlines():
+            line = line.strip()
+            if line.startswith(('http://', 'https://')):
+                yield 'page', line, None
+
+
+class SitemapStream(object):
+    """urls of the sitemaps of one or more sites, yielded while the sitemaps are downloaded
+
+    a pass over the stream starts with the first parsed sitemap, not after the last one. The stream
+    can be iterated several times: later passes replay the urls parsed so far and continue the
+    download where it stopped, so a pass which stops early does not download the rest. The download
+    stops when the deadline has passed or max_urls urls were found. lastmod maps every url to its
+    lastmod in the sitemap (None if not given). Sitemaps whose content did not change since the last
+    run are not parsed again (digests)"""
+
+    def __init__(self, client, homepages, deadline=None, max_urls=MAX_SITEMAP_URLS, digests=None):
+        self.client = client
+        self.digests = digests if digests is not None else SitemapDigests()
+        self.homepages = homepages
+        self.deadline = deadline
+        self.max_urls = max_urls
+        self.urls = list()
+        self.lastmod = dict()
+        self.sitemaps = 0
+        self.source = self.discover()
+        self.done = False
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            if index >= len(self.urls) and not self.more():
+                return
+            yield self.urls[index]
+            index += 1
+
+    def __bool__(self):
+        return bool(self.urls) or self.more()
+
+    def more(self):
+        """parse until one more url is found, False once the sitemaps are exhausted"""
+        with self.lock:
+            if self.done:
+                return False
+            size = len(self.urls)
+            try:
+                while len(self.urls) == size:
+                    url, lastmod = next(self.source)
+                    if url not in self.lastmod:
+                        self.lastmod[url] = lastmod
+                        self.urls.append(url)
+            except StopIteration:
+                self.done = True
+            if self.max_urls and len(self.urls) >= self.max_urls:
+                self.done = True
+            return len(self.urls) > size
+
+    def fetch(self, url):
+        """content of the sitemap, None if there is none"""
+        try:
+            response = self.client.get(url, timeout=SITEMAP_TIMEOUT)
+        except Exception as e:
+            print(f'sitemap {url}: {e}')
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    def robots_sitemaps(self, site):
+        """sitemaps listed in robots.txt (the one the host scheduler has read already if there is one)"""
+        scheduler = getattr(self.client, 'scheduler', None)
+        if scheduler is not None:
+            try:
+                return scheduler.sitemaps(site)
+            except DeadlineExceeded:
+                return list()
+        robots = self.fetch(site + 'robots.txt')
+        if robots is None:
+            return list()
+        return list(Protego.parse(robots.decode('utf-8', 'replace')).sitemaps)
+
+    def load(self, url, depth):
+        """download and parse one sitemap (in a thread of the pool)"""
+        sitemap = self.fetch(url)
+        if sitemap is None:
+            return depth, None, None
+        content_digest = digest(sitemap)
+        entries = self.digests.entries(url, content_digest)
+        if entries is not None:
+            return depth, content_digest, entries
+        try:
+            entries = list(parse_sitemap(sitemap))
+        except (OSError, EOFError, ValueError) as e:
+            print(f'sitemap {url}: {e}')
+            return depth, None, None
+        self.digests.put(url, content_digest, entries)
+        return depth, content_digest, entries
+
+    def discover(self):
+        """(url, lastmod) of the pages of all sitemaps (sitemaps of robots.txt and the usual places)
+
+        sitemaps are downloaded and parsed by a pool of SITEMAP_CONCURRENCY threads, the pages
+        of each sitemap are yielded as soon as it is parsed and the children of an index are
+        requested at once. A sitemap url shared by several sites and a sitemap served under
+        several urls (the same content) are read once"""
+        fetched = set()
+        contents = set()
+        pending = set()
+
+        def submit(url, depth):
+            if url not in fetched and url.startswith(('http://', 'https://')):
+                fetched.add(url)
+                pending.add(executor.submit(self.load, url, depth))
+
+        executor = ThreadPoolExecutor(max_workers=SITEMAP_CONCURRENCY)
+        try:
+            for site in dict.fromkeys(homepage(url) for url in self.homepages):
+                if self.deadline is not None and self.deadline.expired():
+                    return
+                for url in self.robots_sitemaps(site):
+                    submit(url, 0)
+                for path in SITEMAP_PATHS:
+                    submit(site + path, 0)
+                while pending:
+                    timeout = self.deadline.remaining() if self.deadline is not None else None
+                    done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    if not done:
+                        return
+                    for future in done:
+                        pending.discard(future)
+                        depth, content, entries = future.result()
+                        if entries is None or content in contents:
+                            continue
+                        contents.add(content)
+                        self.sitemaps += 1
+                        for kind, location, lastmod in entries:
+                            if kind == 'sitemap':
+                                if depth < MAX_DEPTH:
+                                    submit(location, depth + 1)
+                            elif location.startswith(('http://', 'https://')):
+                                yield location, lastmod
+        finally:
+            # a pass which stopped early does not wait for sitemaps nobody reads
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+            self.digests.close()
+
+    def report(self):
+        return f'{len(self.urls)} urls from {self.sitemaps} sitemaps ({self.digests.unchanged} unchanged)' + \
+            ('' if self.done else ', not all read')
@@ -1,24 +1,30 @@
 import csv
 import re
 import sys
-import time
 from concurrent.futures import TimeoutError
 
 import pandas as pd
 import phonenumbers
 import psycopg2
-import requests
-from bs4 import BeautifulSoup
 from pebble import ProcessPool
 from pyisemail import is_email
-from selenium import webdriver
 from url_normalize import url_normalize
-from usp.tree import sitemap_tree_for_homepage
-from usp.web_client.requests_client import RequestsWebClient
 
+from crawler import AsyncCrawler
+from http_client import get_client
+from keywords import keyword_counter
+from page_document import PageDocument, page_document
+from page_results import PageResults, results_key
+from page_store import PageStore
+from reaper import Reaper
+from render import get_main_page
+from render_service import RENDER_WORKERS, RenderService
+from sitemaps import SitemapStream, canonical_homepages
+from url_index import LEADER, TEAM, UrlIndex
+from utils import DEADLINE_SHARE, Deadline, get_base_url, resolve_links
 
-class _RequestsWebClient(RequestsWebClient):
-    __USER_AGENT = 'Mozilla/5.0'
+# sweeps in the main process (kept out of DomainsAndSubdomains, which is pickled for every task)
+reaper = Reaper()
 
 
 class DomainsAndSubdomains(object):
@@ -48,6 +54,24 @@ class DomainsAndSubdomains(object):
         self.buffer = list()
         self.timeout = timeout
         self.headers = {'User-Agent': 'Mozilla/5.0'}
+        self.pages = None
+        self.deadline = None
+        self.main_page_source = ''
+        self.url_index = None
+
+    @property
+    def client(self):
+        """http client of the current worker process"""
+        return get_client(self.headers)
+
+    def open_domain(self):
+        """per-domain state: time budget (derived from the task timeout), page store and the way the main
+        page was fetched"""
+        self.deadline = Deadline(self.timeout * DEADLINE_SHARE)
+        self.client.deadline = self.deadline
+        self.pages = PageStore(self.client)
+        self.main_page_source = ''
+        self.url_index = None
 
     def get_domains(self):
         """get url and other data from file"""
@@ -73,6 +97,7 @@ class DomainsAndSubdomains(object):
         columns.append('emails_all_pages')
         columns.append('leader_email_sitemap')
         columns.append('leader_email_from_team_sitemap')
+        columns.append('main_page_source')
 
         # with csv lib
         with open(self.result_file, "w", newline="", encoding='UTF-8') as f:
@@ -94,38 +119,39 @@ class DomainsAndSubdomains(object):
         final_list = []
         for link in lst:
             try:
-                req = requests.get(link, headers=self.headers)
+                req = self.pages.get(link)
                 if req.status_code == 200:
                     final_list.append(link)
             except Exception as e:
                 print(f'normalize_urls_list: {e}')
         return lst
 
-    @staticmethod
-    def get_sitemap_tree(common_list):
-        """get all links from sitemap"""
-        sitemap_tree = []
-        for link in common_list:
-            web_client = _RequestsWebClient()
-            tree = sitemap_tree_for_homepage(link, web_client)
-            for page in tree.all_pages():
-                sitemap_tree.append(page.url)
-        return sitemap_tree
-
-    def find_phone_by_keyword(self, url, word):
+    def get_sitemap_tree(self, common_list):
+        """get all links from sitemap (lazily: the passes over it start with the first sitemap)
+
+        the domain and its subdomains often redirect to the same host, its sitemaps are read once"""
+        return SitemapStream(self.client, canonical_homepages(common_list, self.pages), self.deadline)
+
+    def get_url_index(self, sitemap_tree):
+        """buckets of the sitemap urls, classified once per domain for all passes"""
+        if self.url_index is None or self.url_index.sitemap is not sitemap_tree:
+            self.url_index = UrlIndex(
+                sitemap_tree, self.words_for_company_leader, self.words_for_company_team, self.words_for_goods
+            )
+        return self.url_index
+
+    def find_phone_by_keyword(self, document, word):
         """looking for a phone number on the page by keyword"""
         phone_list = []
         try:
-            html = requests.get(url, headers=self.headers).text
-            soup = BeautifulSoup(html, 'lxml')
-            phone = soup.find(text=re.compile(word)).parent  # TODO
+            phone = document.find_text(word).parent  # TODO
             for match in phonenumbers.PhoneNumberMatcher(str(phone), "CH"):
                 result = str(match).split(sep=') ', maxsplit=1)[1]
                 if result:
                     phone_list.append(result)
             if not phone_list:
                 for match in phonenumbers.PhoneNumberMatcher(
-                        str(soup.find(text=re.compile(word)).parent.parent), "CH"):  # noqa
+                        str(document.find_text(word).parent.parent), "CH"):  # noqa
                     result = str(match).split(sep=') ', maxsplit=1)[1]
                     if result:
                         phone_list.append(result)
@@ -133,13 +159,11 @@ class DomainsAndSubdomains(object):
         except Exception as e: # noqa
             return phone_list
 
-    def find_email_by_keyword(self, url, word):
+    def find_email_by_keyword(self, document, word):
         """looking for a email on the page by keyword"""
         email_list = []
         try:
-            html = requests.get(url, headers=self.headers).text
-            soup = BeautifulSoup(html, 'lxml')
-            tag = soup.find(text=re.compile(word)).parent.parent  # TODO
+            tag = document.find_text(word).parent.parent  # TODO
             email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
             if email is not None:
                 email = email.strip()
@@ -160,11 +184,16 @@ class DomainsAndSubdomains(object):
         leader_phone = []
         leader_email = []
         try:
-            for url in sitemap_tree:
-                for word in self.words_for_company_leader:
-                    if word in url:
-                        leader_phone.append(self.find_phone_by_keyword(url, word))
-                        leader_email.append(self.find_email_by_keyword(url, word))
+            url_index = self.get_url_index(sitemap_tree)
+            for url in url_index.urls(LEADER):
+                try:
+                    document = PageDocument(self.pages.get(url).text, url)
+                except Exception as e: # noqa
+                    print(f'get_leader_phone_and_email_from_sitemap {url}: {e}')
+                    continue
+                for word in url_index.leader_matches[url]:
+                    leader_phone.append(self.find_phone_by_keyword(document, word))
+                    leader_email.append(self.find_email_by_keyword(document, word))
         except Exception as e: # noqa
             print(f'get_leader_phone_and_email_from_sitemap: {e}')
         phones = [j for i in leader_phone for j in i]
@@ -178,15 +207,14 @@ class DomainsAndSubdomains(object):
         leader_phone_from_team = []
         leader_email_from_team = []
         try:
-            for url in sitemap_tree:
-                for word in self.words_for_company_team:
-                    if word in url:
-                        leader_phone_from_team.append(
-                            self.find_phones(requests.get(url, headers=self.headers).text, leader=True)
-                        )
-                        leader_email_from_team.append(
-                            self.find_emails(requests.get(url, headers=self.headers).text, leader=True)
-                        )
+            for url in self.get_url_index(sitemap_tree).urls(TEAM):
+                try:
+                    document = PageDocument(self.pages.get(url).text, url)
+                except Exception as e: # noqa
+                    print(f'get_leader_phone_and_email_from_sitemap_section_team {url}: {e}')
+                    continue
+                leader_phone_from_team.append(self.find_phones(document, leader=True))
+                leader_email_from_team.append(self.find_emails(document, leader=True))
         except Exception as e: # noqa
             print(f'get_leader_phone_and_email_from_sitemap_section_team: {e}')
         phones = [j for i in leader_phone_from_team for j in i]
@@ -203,18 +231,14 @@ class DomainsAndSubdomains(object):
         all_pages_emails = []
 
         # 1 way: counting the number of products according to the sitemap links
-        urls_list = str(sitemap_tree)
-
         if self.mode == '1':
-            for word in self.words_for_goods:
-                counter += urls_list.count(word)
+            counter = self.count_goods_in_urls(sitemap_tree)
 
         # 2 way: follow each link in sitemap and check keywords on each page
         # (if no goods were found in the way 1)
         # (using requests, since with selenium it will take much longer)
         if self.mode == '2':
-            for word in self.words_for_goods:
-                counter += urls_list.count(word)
+            counter = self.count_goods_in_urls(sitemap_tree)
             if counter == 0:
                 counter, all_pages_phone, all_pages_emails = self.check_every_page(sitemap_tree)
 
@@ -224,42 +248,55 @@ class DomainsAndSubdomains(object):
 
         return counter, all_pages_phone, all_pages_emails
 
+    def count_goods_in_urls(self, sitemap_tree):
+        """count the keywords of goods in the sitemap links (url by url while the sitemaps are read)"""
+        return self.get_url_index(sitemap_tree).goods_count()
+
     def check_every_page(self, sitemap_tree):
-        """check each page for product availability (by keywords)"""
+        """check each page for product availability (by keywords), pages which did not change since
+        the last run are taken from its results"""
         counter = 0
         phones = []
         emails = []
-        for url in sitemap_tree:
-            try:
-                response = requests.get(url, headers=self.headers)
-                text = response.text
-                for word in self.words_for_goods:
-                    counter += text.count(word)
-                phones.append(self.find_phones(text, leader=True))
-                emails.append(self.find_emails(text, leader=True))
-            except Exception as e:
-                print(f'check_every_page: {e}')
+
+        def check_page(text):
+            goods = keyword_counter(self.words_for_goods).count(text)
+            document = PageDocument(text)
+            return goods, self.find_phones(document, leader=True), self.find_emails(document, leader=True)
+
+        crawler = AsyncCrawler(
+            lambda url: self.pages.get(url, keep=False), scheduler=self.client.scheduler, deadline=self.deadline
+        )
+        page_results = PageResults(
+            'store_identifier', results_key(self.words_for_goods, self.words_for_company_leader)
+        )
+        for goods, page_phones, page_emails in page_results.check_pages(sitemap_tree, crawler, check_page):
+            counter += goods
+            phones.append(page_phones)
+            emails.append(page_emails)
+        print(f'check_every_page concurrency: {crawler.controller.report()}')
+        print(f'check_every_page pages: {page_results.report()}')
         phones = [j for i in phones for j in i]
         phones = self.unique_phones(phones)
         emails = [j for i in emails for j in i]
         emails = self.unique_emails(emails)
         return counter, phones, emails
 
-    def find_phones(self, text, leader=False):
-        """the method searches for phone numbers on the page"""
+    def find_phones(self, page, leader=False):
+        """the method searches for phone numbers on the page (html or a parsed PageDocument)"""
         phones = list()
         try:
+            document = page_document(page)
             if leader is False:
-                for match in phonenumbers.PhoneNumberMatcher(text, "CH"):
+                for match in phonenumbers.PhoneNumberMatcher(document.html, "CH"):
                     phone = str(match).split(sep=') ', maxsplit=1)[1]
                     if phone:
                         phones.append(phone)
             if leader is True:
-                soup = BeautifulSoup(text, 'lxml')
                 for word in self.words_for_company_leader:
-                    if word in str(soup):
+                    if word in document.serialized:
                         try:
-                            for match in phonenumbers.PhoneNumberMatcher(str(soup.find(text=re.compile(word)).parent), "CH"):   # noqa  TODO
+                            for match in phonenumbers.PhoneNumberMatcher(str(document.find_text(word).parent), "CH"):   # noqa  TODO
                                 result = str(match).split(sep=') ', maxsplit=1)[1]
                                 if result:
                                     phones.append(result)
@@ -267,9 +304,9 @@ class DomainsAndSubdomains(object):
                             continue
                 if not phones:  # noqa
                     for word in self.words_for_company_leader:
-                        if word in str(soup):
+                        if word in document.serialized:
                             try:
-                                for match in phonenumbers.PhoneNumberMatcher(str(soup.find(text=re.compile(word)).parent.parent), "CH"):  # noqa  TODO
+                                for match in phonenumbers.PhoneNumberMatcher(str(document.find_text(word).parent.parent), "CH"):  # noqa  TODO
                                     result = str(match).split(sep=') ', maxsplit=1)[1]
                                     if result:
                                         phones.append(result)
@@ -280,13 +317,13 @@ class DomainsAndSubdomains(object):
             print(f'find_phones: {e}')
         return phones
 
-    def find_emails(self, text, leader=False):
-        """the method searches for email on the page"""
+    def find_emails(self, page, leader=False):
+        """the method searches for email on the page (html or a parsed PageDocument)"""
         emails = list()
         try:
-            soup = BeautifulSoup(text, 'lxml')
+            document = page_document(page)
             if leader is False:
-                results = soup.findAll(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
+                results = document.soup.findAll(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                 for email in results:
                     if email is not None:
                         email = email.strip()
@@ -299,9 +336,9 @@ class DomainsAndSubdomains(object):
                                 emails.append(result[0])
             if leader is True:
                 for word in self.words_for_company_leader:
-                    if word in str(soup):
+                    if word in document.serialized:
                         try:
-                            tag = soup.find(text=re.compile(word)).parent    # TODO
+                            tag = document.find_text(word).parent    # TODO
                             email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))   # noqa
                             if email is not None:
                                 email = email.strip()
@@ -316,9 +353,9 @@ class DomainsAndSubdomains(object):
                             continue
                 if not emails:
                     for word in self.words_for_company_leader:
-                        if word in str(soup):
+                        if word in document.serialized:
                             try:
-                                tag = soup.find(text=re.compile(word)).parent.parent  # TODO
+                                tag = document.find_text(word).parent.parent  # TODO
                                 email = tag.find(text=re.compile(r'[\w\.-]+@[\w\.-]+(\.[\w]+)+'))  # noqa
                                 if email is not None:
                                     email = email.strip()
@@ -344,6 +381,8 @@ class DomainsAndSubdomains(object):
         except TimeoutError as error:
             self.buffer.append(future.item)
             print("Function took longer than %d seconds" % error.args[1])
+            # the worker was killed together with the task, its browsers are orphans now
+            reaper.sweep()
         except Exception as error:
             self.buffer.append(future.item)
             print("Function raised %s" % error)
@@ -353,6 +392,14 @@ class DomainsAndSubdomains(object):
         # get domains from file
         self.get_domains()
 
+        # kill browsers left by workers of this run (timeouts, replaced workers) and of earlier runs
+        reaper.start()
+
+        # with RENDER_WORKERS the crawl workers send their renders to a render service of that size
+        render_service = RenderService() if RENDER_WORKERS else None
+        if render_service is not None:
+            render_service.start()
+
         # create a pool for multi-threaded processing
         with ProcessPool(max_workers=5, max_tasks=10) as pool:
             for i in self.domains:
@@ -360,6 +407,11 @@ class DomainsAndSubdomains(object):
                 future.item = i
                 future.add_done_callback(self.task_done)
 
+        if render_service is not None:
+            render_service.stop()
+        reaper.stop()
+        print(f'reaper: {reaper.report()}')
+
         # add objects to the database with which a connection could not be established
         try:
             self.run_buffer()
@@ -385,6 +437,7 @@ class DomainsAndSubdomains(object):
             if 'shop' in domain or 'store' in domain:
                 is_shop = True
 
+            self.open_domain()
             try:
                 is_shop, main_page_phone, main_page_email, phone, email = self.is_shop_and_main_page(domain, is_shop)
                 leader_phone_without_sitemap = phone
@@ -414,7 +467,7 @@ class DomainsAndSubdomains(object):
                 leader_phone_from_team=leader_phone_from_team, email=email,
                 leader_email_without_sitemap=leader_email_without_sitemap, leader_email=leader_email,
                 leader_email_from_team=leader_email_from_team, main_page_email=main_page_email,
-                all_pages_email=all_pages_email
+                all_pages_email=all_pages_email, main_page_source=self.main_page_source
             )
             self.open_db()
             self.cur.execute(
@@ -423,9 +476,9 @@ class DomainsAndSubdomains(object):
                      Mitarbeiter, Mitarbeiter_Gruppe, is_shop, number_of_goods, phone, phone_main_page,
                      leader_phone_without_sitemap, phones_all_pages, leader_phone_sitemap, 
                      leader_phone_from_team_sitemap, email, email_main_page, leader_email_without_sitemap,  
-                     emails_all_pages, leader_email_sitemap, leader_email_from_team_sitemap
+                     emails_all_pages, leader_email_sitemap, leader_email_from_team_sitemap, main_page_source
                      )
-                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", (   # noqa
+                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", (   # noqa
                     item['DUNS'],
                     item['Handelsregister-Nummer'],
                     item['UID'],
@@ -448,7 +501,8 @@ class DomainsAndSubdomains(object):
                     str(leader_email_without_sitemap),
                     str(all_pages_email),
                     str(leader_email),
-                    str(leader_email_from_team)
+                    str(leader_email_from_team),
+                    self.main_page_source
                 )
             )
             self.connection.commit()
@@ -476,13 +530,14 @@ class DomainsAndSubdomains(object):
             subdomains_list = list()
             domain_is_shop = False
             domain = str(domain)
+            self.open_domain()
             if domain != 'nan':
 
                 # take a domain
                 target = self.clear_url(domain)
 
                 # make a request to an external service
-                req = requests.get("https://crt.sh/?q=%.{d}&output=json".format(d=target), headers=self.headers)
+                req = self.client.get("https://crt.sh/?q=%.{d}&output=json".format(d=target))
 
                 if req.status_code != 200:
                     print("[X] Information not available!")
@@ -527,9 +582,13 @@ class DomainsAndSubdomains(object):
                             self.get_leader_phone_and_email_from_sitemap_section_team(sitemap_tree)
                         counter, all_pages_phone, all_pages_email = \
                             self.check_phones_emails_on_every_page_and_count_the_quantity_of_goods(sitemap_tree)
+                        url_index = self.get_url_index(sitemap_tree)
+                        print(f'sitemap {domain}: {sitemap_tree.report()} ({url_index.report()})')
                     else:
                         pass
 
+                print(f'page store {domain}: {self.pages.report()}')
+
                 phone, leader_phone_without_sitemap, leader_phone, leader_phone_from_team, main_page_phone,\
                     all_pages_phone = self.phone(
                         leader_phone_without_sitemap=leader_phone_without_sitemap, leader_phone=leader_phone,
@@ -552,7 +611,7 @@ class DomainsAndSubdomains(object):
                     leader_phone_from_team=leader_phone_from_team, email=email,
                     leader_email_without_sitemap=leader_email_without_sitemap, leader_email=leader_email,
                     leader_email_from_team=leader_email_from_team, main_page_email=main_page_email,
-                    all_pages_email=all_pages_email
+                    all_pages_email=all_pages_email, main_page_source=self.main_page_source
                 )
 
                 self.open_db()
@@ -562,9 +621,9 @@ class DomainsAndSubdomains(object):
                      Mitarbeiter, Mitarbeiter_Gruppe, is_shop, number_of_goods, phone, phone_main_page,
                      leader_phone_without_sitemap, phones_all_pages, leader_phone_sitemap, 
                      leader_phone_from_team_sitemap, email, email_main_page, leader_email_without_sitemap,  
-                     emails_all_pages, leader_email_sitemap, leader_email_from_team_sitemap
+                     emails_all_pages, leader_email_sitemap, leader_email_from_team_sitemap, main_page_source
                      )
-                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", (   # noqa
+                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", (   # noqa
                         item['DUNS'],
                         item['Handelsregister-Nummer'],
                         item['UID'],
@@ -587,7 +646,8 @@ class DomainsAndSubdomains(object):
                         str(leader_email_without_sitemap),
                         str(all_pages_email),
                         str(leader_email),
-                        str(leader_email_from_team)
+                        str(leader_email_from_team),
+                        self.main_page_source
                     )
                 )
                 self.connection.commit()
@@ -700,42 +760,33 @@ class DomainsAndSubdomains(object):
         email = []
         try:
             shops = []
-            chrome_options = webdriver.ChromeOptions()
-            chrome_options.headless = True
-            browser = webdriver.Chrome('chromedriver', chrome_options=chrome_options)
-            browser.get(domain)
-            time.sleep(5)
-            html = browser.page_source
+            # most main pages are complete without scripts, only the others are rendered by the browser
+            # parsed once for all the checks below
+            main_page, self.main_page_source = get_main_page(self.pages, domain, self.deadline)
             # is shop
-            soup = str(BeautifulSoup(html, 'lxml'))
-            for word in self.words_for_shop:
-                if word in soup:
-                    shops.append(domain)
-                else:
-                    pass
+            if keyword_counter(self.words_for_shop).found(main_page.serialized):
+                shops.append(domain)
 
             # main_page_phone
             try:
-                main_page_phone = self.find_phones(html)
+                main_page_phone = self.find_phones(main_page)
             except Exception as e:
                 main_page_phone = ''
                 print(f'is_shop_and_main_page (phones error): {e}')
 
             # main_page_email
             try:
-                main_page_email = self.find_emails(html)
+                main_page_email = self.find_emails(main_page)
             except Exception as e:
                 main_page_email = ''
                 print(f'is_shop_and_main_page (emails error): {e}')
 
-            browser.close()
-
             if len(shops) > 0 or domain_is_shop is True:
                 shop = True
 
                 # phone_and_email_from_contacts
                 try:
-                    contact_links_from_main_page = self.contact(html, domain)
+                    contact_links_from_main_page = self.contact(main_page, domain)
                     print(f'contact_links_from_main_page {contact_links_from_main_page}')
                 except Exception as e:
                     contact_links_from_main_page = ''
@@ -743,19 +794,12 @@ class DomainsAndSubdomains(object):
 
                 try:
                     for link in contact_links_from_main_page:
-                        response = requests.get(link, headers=self.headers)
-                        text = response.text
-                        phone.append(self.find_phones(text, leader=True)) # noqa
+                        response = self.pages.get(link)
+                        contact_page = PageDocument(response.text, response.final_url)
+                        phone.append(self.find_phones(contact_page, leader=True)) # noqa
+                        email.append(self.find_emails(contact_page, leader=True))
                 except Exception as e:
-                    print(f'is_shop_and_main_page (phone error): {e}')
-
-                try:
-                    for link in contact_links_from_main_page:
-                        response = requests.get(link, headers=self.headers)
-                        text = response.text
-                        email.append(self.find_emails(text, leader=True))
-                except Exception as e:
-                    print(f'is_shop_and_main_page (email error): {e}')
+                    print(f'is_shop_and_main_page (phone and email error): {e}')
             else:
                 shop = False
                 main_page_phone = []
@@ -771,32 +815,24 @@ class DomainsAndSubdomains(object):
             print(f'is_shop: {e}')
             return shop, main_page_phone, main_page_email, phone, email
 
-    def contact(self, text, url):
-        """looking for a section with contacts on the main page"""
+    def contact(self, page, url):
+        """looking for a section with contacts on the main page (html or a parsed PageDocument)"""
         urls_list = []
         try:
-            soup = BeautifulSoup(text, 'lxml')
-            links = [[link.get('href'), link] for link in soup.findAll('a')]
-            for result in links:
-                link = result[0]
-                tag_text = str(result[1].text).lower()
-                for word in self.words_for_company_team:
-                    if link is not None and (word in link or word in tag_text):
-                        try:
-                            if requests.get(url + '/' + link).status_code == 200:
-                                urls_list.append(url + '/' + link)
-                        except:  # noqa
-                            pass
-                        try:
-                            if requests.get(url + link).status_code == 200:
-                                urls_list.append(url + link)
-                        except:  # noqa
-                            pass
-                        try:
-                            if requests.get(link).status_code == 200:
-                                urls_list.append(link)
-                        except:  # noqa
-                            pass
+            document = page_document(page, url)
+            links = list()
+            for link, tag_text in document.anchors:
+                if any(word in link or word in tag_text for word in self.words_for_company_team):
+                    links.append(link)
+
+            # each link is resolved once against the url the page was found at (after its redirects)
+            # and checked with a single request
+            for link in resolve_links(get_base_url(document.soup, document.url or url), links):
+                try:
+                    if self.pages.get(link).status_code == 200:
+                        urls_list.append(link)
+                except:  # noqa
+                    pass
         except Exception: # noqa
             pass
         return urls_list
@@ -841,7 +877,8 @@ class DomainsAndSubdomains(object):
     def write_to_file(
             self, item, is_shop, number_of_goods, shop_domain,
             phone, leader_phone_without_sitemap, main_page_phone, all_pages_phone, leader_phone, leader_phone_from_team,
-            email, leader_email_without_sitemap, main_page_email, all_pages_email, leader_email, leader_email_from_team
+            email, leader_email_without_sitemap, main_page_email, all_pages_email, leader_email, leader_email_from_team,
+            main_page_source=''
     ):
         """write data to file"""
         lst = list(item.values())
@@ -860,6 +897,7 @@ class DomainsAndSubdomains(object):
         lst.append(all_pages_email)
         lst.append(leader_email)
         lst.append(leader_email_from_team)
+        lst.append(main_page_source)
 
         # with csv lib
         with open(self.result_file, "a", newline="", encoding='UTF-8') as f:
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import requests
+
+from crawler import AimdController, AsyncCrawler, ERROR_WINDOW
+
+
+class AimdControllerTest(unittest.TestCase):
+
+    def test_initial_limit(self):
+        self.assertEqual(AimdController(initial=2).limit('shop.ch'), 2)
+
+    def test_additive_increase(self):
+        controller = AimdController(initial=2, maximum=10)
+        for _ in range(2):
+            controller.record('shop.ch', time.monotonic(), status=200)
+        self.assertEqual(controller.limit('shop.ch'), 3)
+        for _ in range(3):
+            controller.record('shop.ch', time.monotonic(), status=200)
+        self.assertEqual(controller.limit('shop.ch'), 4)
+
+    def test_maximum(self):
+        controller = AimdController(initial=2, maximum=3)
+        for _ in range(20):
+            controller.record('shop.ch', time.monotonic(), status=200)
+        self.assertEqual(controller.limit('shop.ch'), 3)
+
+    def test_backoff_status_halves(self):
+        controller = AimdController(initial=8)
+        controller.record('shop.ch', time.monotonic(), status=429)
+        self.assertEqual(controller.limit('shop.ch'), 4)
+        self.assertEqual(controller.metrics()['shop.ch']['changes'], {'status 429': 1})
+
+    def test_timeout_halves(self):
+        controller = AimdController(initial=8)
+        controller.record('shop.ch', time.monotonic(), error=requests.exceptions.ReadTimeout())
+        self.assertEqual(controller.limit('shop.ch'), 4)
+
+    def test_one_decrease_per_round(self):
+        controller = AimdController(initial=8)
+        started = time.monotonic()
+        controller.record('shop.ch', started, status=503)
+        # requests started before the decrease do not decrease again
+        controller.record('shop.ch', started, status=503)
+        self.assertEqual(controller.limit('shop.ch'), 4)
+        controller.record('shop.ch', time.monotonic(), status=503)
+        self.assertEqual(controller.limit('shop.ch'), 2)
+
+    def test_minimum(self):
+        controller = AimdController(initial=1, minimum=1)
+        controller.record('shop.ch', time.monotonic(), status=503)
+        self.assertEqual(controller.limit('shop.ch'), 1)
+
+    def test_error_rate(self):
+        controller = AimdController(initial=8, maximum=8)
+        for _ in range(ERROR_WINDOW // 2):
+            controller.record('shop.ch', time.monotonic(), status=500)
+        self.assertLess(controller.limit('shop.ch'), 8)
+        self.assertIn('error rate', controller.metrics()['shop.ch']['changes'])
+
+    def test_hosts_are_independent(self):
+        controller = AimdController(initial=4)
+        controller.record('slow.ch', time.monotonic(), status=503)
+        self.assertEqual(controller.limit('slow.ch'), 2)
+        self.assertEqual(controller.limit('fast.ch'), 4)
+
+
+class AsyncCrawlerTest(unittest.TestCase):
+
+    def test_every_url_is_handled(self):
+        seen = list()
+        crawler = AsyncCrawler(lambda url: SimpleNamespace(status_code=200), concurrency=4)
+        crawler.crawl(iter(f'https://shop.ch/{i}' for i in range(50)), lambda url, response: seen.append(url))
+        self.assertEqual(sorted(seen), sorted(f'https://shop.ch/{i}' for i in range(50)))
+
+    def test_host_limit(self):
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'peak': 0}
+
+        def fetch(url):
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            time.sleep(0.01)
+            with lock:
+                state['in_flight'] -= 1
+            return SimpleNamespace(status_code=200)
+
+        controller = AimdController(initial=2, maximum=2)
+        crawler = AsyncCrawler(fetch, controller=controller, concurrency=20)
+        crawler.crawl([f'https://shop.ch/{i}' for i in range(30)], lambda url, response: None)
+        self.assertLessEqual(state['peak'], 2)
+
+    def test_failures_do_not_stop_the_crawl(self):
+        seen = list()
+
+        def fetch(url):
+            if url.endswith('3'):
+                raise requests.exceptions.ConnectionError('refused')
+            return SimpleNamespace(status_code=200)
+
+        def handler(url, response):
+            if url.endswith('7'):
+                raise ValueError('broken page')
+            seen.append(url)
+
+        crawler = AsyncCrawler(fetch, concurrency=4)
+        crawler.crawl([f'https://shop.ch/{i}' for i in range(20)], handler)
+        self.assertEqual(len(seen), 16)
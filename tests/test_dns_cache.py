@@ -0,0 +1,82 @@
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from dns_cache import DnsCache
+
+
+class DnsCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'dns.sqlite')
+        self.lookups = list()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        self.lookups.append(host)
+        if host == 'missing.ch':
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('192.0.2.1', 0))]
+
+    def cache(self):
+        cache = DnsCache(self.path, getaddrinfo=self.getaddrinfo)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_addresses_are_shared_between_processes(self):
+        first = self.cache().getaddrinfo('shop.ch', 443)
+        second = self.cache().getaddrinfo('shop.ch', 80)
+        self.assertEqual(first[0][4], ('192.0.2.1', 443))
+        self.assertEqual(second[0][4], ('192.0.2.1', 80))
+        self.assertEqual(self.lookups, ['shop.ch'])
+
+    def test_negative_answers(self):
+        cache = self.cache()
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                cache.getaddrinfo('missing.ch', 443)
+        self.assertEqual(self.lookups, ['missing.ch'])
+
+    def test_threads_share_one_connection(self):
+        cache = self.cache()
+        connections = list()
+
+        def lookup(index):
+            cache.getaddrinfo(f'shop{index}.ch', 443)
+            connections.append(cache.db)
+
+        threads = [threading.Thread(target=lookup, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, connections))), 1)
+        self.assertEqual(len(self.lookups), 8)
+
+    def test_expired_entries_are_deleted(self):
+        cache = self.cache()
+        cache.put('addr old.ch', None, -1)
+        cache.put('addr new.ch', None, 60)
+        cache.close()
+        self.cache().getaddrinfo('shop.ch', 443)
+        db = sqlite3.connect(self.path)
+        keys = {row[0] for row in db.execute('SELECT key FROM dns')}
+        db.close()
+        self.assertNotIn('addr old.ch', keys)
+        self.assertIn('addr new.ch', keys)
+
+    def test_close(self):
+        cache = self.cache()
+        cache.getaddrinfo('shop.ch', 443)
+        cache.close()
+        self.assertIsNone(cache.db)
+        # a lookup after close opens the database again
+        cache.local.clear()
+        self.assertEqual(cache.getaddrinfo('shop.ch', 443)[0][4][0], '192.0.2.1')
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from http_cache import HttpCache
+
+
+def response(status_code, body=b'', headers=None, url=None):
+    result = requests.Response()
+    result.status_code = status_code
+    result.headers = CaseInsensitiveDict(headers or {})
+    result.encoding = 'utf-8'
+    result.url = url
+    result._content = body
+    result._content_consumed = True
+    return result
+
+
+class FakeServer(object):
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = list()
+
+    def request(self, url, **kwargs):
+        self.requests.append((url, kwargs.get('headers', {})))
+        return self.responses.pop(0)
+
+
+class HttpCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = HttpCache(self.folder, ttl=60)
+        self.page = response(200, b'<html>shop</html>', {
+            'Content-Type': 'text/html', 'ETag': '"v1"', 'Last-Modified': 'Sat, 01 May 2021 00:00:00 GMT',
+            'Set-Cookie': 'session=1'
+        }, url='https://www.shop.ch/de/')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def expire(self):
+        self.cache.ttl = 0
+
+    def test_fresh_entry_is_used_without_request(self):
+        server = FakeServer(self.page)
+        self.cache.get(server.request, 'https://shop.ch')
+        cached = self.cache.get(server.request, 'https://shop.ch#top')
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(cached.text, '<html>shop</html>')
+        self.assertEqual(cached.url, 'https://www.shop.ch/de/')
+        self.assertEqual(cached.headers['ETag'], '"v1"')
+        self.assertNotIn('Set-Cookie', cached.headers)
+
+    def test_stale_entry_is_revalidated(self):
+        server = FakeServer(self.page, response(304))
+        self.cache.get(server.request, 'https://shop.ch')
+        self.expire()
+        cached = self.cache.get(server.request, 'https://shop.ch', headers={'Accept': 'text/html'})
+        self.assertEqual(server.requests[1][1], {
+            'Accept': 'text/html', 'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 01 May 2021 00:00:00 GMT'
+        })
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.text, '<html>shop</html>')
+
+    def test_not_modified_refreshes_the_entry(self):
+        server = FakeServer(self.page, response(304))
+        self.cache.get(server.request, 'https://shop.ch')
+        stored_at = self.cache.load(self.cache.key('https://shop.ch'))['stored_at']
+        time.sleep(0.01)
+        self.expire()
+        self.cache.get(server.request, 'https://shop.ch')
+        self.assertGreater(self.cache.load(self.cache.key('https://shop.ch'))['stored_at'], stored_at)
+
+    def test_changed_page_replaces_the_entry(self):
+        server = FakeServer(self.page, response(200, b'<html>new</html>', {'ETag': '"v2"'}))
+        self.cache.get(server.request, 'https://shop.ch')
+        self.expire()
+        self.assertEqual(self.cache.get(server.request, 'https://shop.ch').text, '<html>new</html>')
+        self.cache.ttl = 60
+        self.assertEqual(self.cache.get(server.request, 'https://shop.ch').text, '<html>new</html>')
+        self.assertEqual(len(server.requests), 2)
+
+    def test_errors_are_not_stored(self):
+        server = FakeServer(response(503), self.page)
+        self.assertEqual(self.cache.get(server.request, 'https://shop.ch').status_code, 503)
+        self.assertEqual(self.cache.get(server.request, 'https://shop.ch').status_code, 200)
+        self.assertEqual(server.requests[1][1], {})
+
+    def test_same_body_is_stored_once(self):
+        server = FakeServer(self.page, response(200, b'<html>shop</html>'))
+        self.cache.get(server.request, 'https://shop.ch/a')
+        self.cache.get(server.request, 'https://shop.ch/b')
+        objects = [name for _, _, names in os.walk(os.path.join(self.folder, 'objects')) for name in names]
+        self.assertEqual(len(objects), 1)
+
+    def test_missing_body_is_a_miss(self):
+        server = FakeServer(self.page, self.page)
+        self.cache.get(server.request, 'https://shop.ch')
+        shutil.rmtree(os.path.join(self.folder, 'objects'))
+        self.cache.get(server.request, 'https://shop.ch')
+        self.assertEqual(server.requests[1][1], {})
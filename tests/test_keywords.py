@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from keywords import KeywordCounter, keyword_counter
+
+
+class KeywordCounterTest(unittest.TestCase):
+
+    def test_counts_equal_str_count(self):
+        # overlapping words, words inside words and repeated letters
+        words = ['service', 'services', 'ware', 'warenkorb', 'aa', 'aaa', 'CHF', 'produ']
+        pieces = ['service', 's', 'warenkorb', 'ware', 'a', 'aa', 'CHF', 'produkt', ' ', 'x']
+        rng = random.Random(1)
+        for _ in range(200):
+            text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+            self.assertEqual(KeywordCounter(words).counts(text), {word: text.count(word) for word in words})
+
+    def test_count(self):
+        self.assertEqual(KeywordCounter(['pay', 'buy']).count('buy now, pay later, buy'), 3)
+
+    def test_found_keeps_the_order_of_the_words(self):
+        counter = KeywordCounter(['team', 'kontakt', 'about_us'])
+        self.assertEqual(counter.found('/about_us/team'), ['team', 'about_us'])
+        self.assertEqual(counter.found('/shop'), [])
+
+    def test_case_sensitive(self):
+        self.assertEqual(KeywordCounter(['CHF']).count('chf CHF'), 1)
+
+    def test_no_words_no_text(self):
+        self.assertEqual(KeywordCounter([]).count('anything'), 0)
+        self.assertEqual(KeywordCounter(['a']).count(''), 0)
+
+    def test_duplicate_words(self):
+        self.assertEqual(KeywordCounter(['a', 'a']).counts('aa'), {'a': 2})
+
+    def test_counter_is_built_once_per_list(self):
+        self.assertIs(keyword_counter(['x', 'y']), keyword_counter(['x', 'y']))
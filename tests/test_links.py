@@ -0,0 +1,54 @@
+import unittest
+from types import SimpleNamespace
+
+from bs4 import BeautifulSoup
+
+from page_document import PageDocument
+from store_identifier import DomainsAndSubdomains
+from utils import get_base_url, resolve_links
+
+
+class BaseUrlTest(unittest.TestCase):
+
+    def test_page_url(self):
+        soup = BeautifulSoup('<html><body></body></html>', 'lxml')
+        self.assertEqual(get_base_url(soup, 'https://www.shop.ch/de/'), 'https://www.shop.ch/de/')
+        self.assertEqual(get_base_url(soup, 'https://Shop.ch'), 'https://shop.ch/')
+
+    def test_base_tag(self):
+        soup = BeautifulSoup('<html><head><base href="/shop/"></head></html>', 'lxml')
+        self.assertEqual(get_base_url(soup, 'https://www.shop.ch/de/'), 'https://www.shop.ch/shop/')
+        soup = BeautifulSoup('<html><head><base href="https://cdn.shop.ch/"></head></html>', 'lxml')
+        self.assertEqual(get_base_url(soup, 'https://www.shop.ch/de/'), 'https://cdn.shop.ch/')
+
+
+class ResolveLinksTest(unittest.TestCase):
+
+    def test_relative_links(self):
+        links = ['kontakt', '/impressum', '../team/', 'https://other.ch/contact', '//shop.ch/about']
+        self.assertEqual(resolve_links('https://www.shop.ch/de/', links), [
+            'https://www.shop.ch/de/kontakt', 'https://www.shop.ch/impressum', 'https://www.shop.ch/team/',
+            'https://other.ch/contact', 'https://shop.ch/about'
+        ])
+
+    def test_fragments_duplicates_and_other_schemes(self):
+        links = [' kontakt ', 'kontakt#form', 'mailto:info@shop.ch', 'tel:+41441234567', 'javascript:void(0)', '#top']
+        resolved = resolve_links('https://www.shop.ch/de/', links)
+        self.assertEqual(resolved, ['https://www.shop.ch/de/kontakt', 'https://www.shop.ch/de/'])
+
+
+class ContactLinksTest(unittest.TestCase):
+
+    def test_links_resolve_against_the_final_url(self):
+        checked = list()
+
+        def get(url):
+            checked.append(url)
+            return SimpleNamespace(status_code=200 if url.endswith('kontakt') else 404)
+
+        identifier = DomainsAndSubdomains('domains.xlsx')
+        identifier.pages = SimpleNamespace(get=get)
+        html = '<html><body><a href="kontakt">Kontakt</a><a href="team">Team</a><a href="shop">Shop</a></body></html>'
+        document = PageDocument(html, 'https://www.shop.ch/de/')
+        self.assertEqual(identifier.contact(document, 'https://shop.ch'), ['https://www.shop.ch/de/kontakt'])
+        self.assertEqual(checked, ['https://www.shop.ch/de/kontakt', 'https://www.shop.ch/de/team'])
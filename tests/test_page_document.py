@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+
+from bs4 import BeautifulSoup
+
+from page_document import PageDocument, page_document
+from store_identifier import DomainsAndSubdomains
+
+HTML = '''<!DOCTYPE html>
+<html><head><title>Velo Shop</title><style>.kontakt { color: red }</style></head>
+<body>
+  <!-- info@old-shop.ch -->
+  <h1>Velo Shop</h1>
+  <script>var contact = "info@script.ch";</script>
+  <noscript>Bitte JavaScript einschalten</noscript>
+  <div><p>Geschäftsführer Hans Muster</p><p>Tel. 044 123 45 67</p><p>hans@shop.ch</p></div>
+  <a href="/Kontakt">Kontakt</a><a name="top">Oben</a><a href="">Home</a>
+</body></html>'''
+
+
+class PageDocumentTest(unittest.TestCase):
+
+    def test_html_is_parsed_once(self):
+        document = PageDocument(HTML)
+        with mock.patch('page_document.BeautifulSoup', wraps=BeautifulSoup) as parse:
+            for _ in range(2):
+                document.soup
+                document.serialized
+                document.text
+                document.anchors
+                document.find_text('Geschäftsführer')
+        self.assertEqual(parse.call_count, 1)
+
+    def test_visible_text(self):
+        text = PageDocument(HTML).text
+        # no title, style, comment, script or noscript
+        self.assertEqual(
+            text, 'Velo Shop Geschäftsführer Hans Muster Tel. 044 123 45 67 hans@shop.ch Kontakt Oben Home'
+        )
+
+    def test_anchors(self):
+        self.assertEqual(PageDocument(HTML).anchors, [('/Kontakt', 'kontakt'), ('', 'home')])
+
+    def test_find_text(self):
+        document = PageDocument(HTML)
+        found = document.find_text('Geschäftsführer')
+        self.assertEqual(found.parent.name, 'p')
+        self.assertIs(document.find_text('Geschäftsführer'), found)
+        self.assertIsNone(document.find_text('Inhaber'))
+
+    def test_empty_page(self):
+        document = PageDocument(None)
+        self.assertEqual((document.html, document.text, document.anchors), ('', '', []))
+
+    def test_page_document(self):
+        document = PageDocument(HTML, 'https://shop.ch/')
+        self.assertIs(page_document(document), document)
+        self.assertEqual(page_document(HTML, 'https://shop.ch/').url, 'https://shop.ch/')
+
+
+class SharedDocumentTest(unittest.TestCase):
+    """the extractors find the same on the html and on a document they share"""
+
+    def setUp(self):
+        self.identifier = DomainsAndSubdomains('domains.xlsx')
+
+    def test_extractors(self):
+        document = PageDocument(HTML)
+        for leader in (False, True):
+            self.assertEqual(self.identifier.find_phones(document, leader), self.identifier.find_phones(HTML, leader))
+            self.assertEqual(self.identifier.find_emails(document, leader), self.identifier.find_emails(HTML, leader))
+        self.assertEqual(self.identifier.find_phones(document, leader=True), ['0441234567'])
+        self.assertIn('hans@shop.ch', self.identifier.find_emails(document, leader=True))
+
+    def test_extractors_do_not_change_the_document(self):
+        document = PageDocument(HTML)
+        serialized = document.serialized
+        self.identifier.find_phones(document, leader=True)
+        self.identifier.find_emails(document, leader=True)
+        self.identifier.contact(document, 'https://shop.ch/')
+        self.assertEqual(str(document.soup), serialized)
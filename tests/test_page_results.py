@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from page_results import PageResults, results_key
+
+
+class Sitemap(list):
+
+    def __init__(self, lastmod):
+        super().__init__(lastmod)
+        self.lastmod = dict(lastmod)
+
+
+class FakeCrawler(object):
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.downloaded = list()
+
+    def crawl(self, urls, handler):
+        for url in urls:
+            self.downloaded.append(url)
+            handler(url, SimpleNamespace(text=self.pages[url]))
+
+
+class PageResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'pages.sqlite')
+        self.pages = {'https://shop.ch/a': 'page a', 'https://shop.ch/b': 'page b'}
+        self.checked = list()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def check(self, text):
+        self.checked.append(text)
+        return len(text)
+
+    def run_check(self, lastmod, key='', ttl=3600):
+        crawler = FakeCrawler(self.pages)
+        page_results = PageResults('store_identifier', key, path=self.path, ttl=ttl)
+        results = page_results.check_pages(Sitemap(lastmod), crawler, self.check)
+        return page_results, crawler, sorted(results)
+
+    def test_first_run_checks_every_page(self):
+        page_results, crawler, results = self.run_check({'https://shop.ch/a': '2021-05-01', 'https://shop.ch/b': ''})
+        self.assertEqual(results, [6, 6])
+        self.assertEqual(page_results.checked, 2)
+        self.assertEqual(len(crawler.downloaded), 2)
+        self.assertTrue(page_results.closed)
+
+    def test_lastmod_unchanged(self):
+        lastmod = {'https://shop.ch/a': '2021-05-01', 'https://shop.ch/b': ''}
+        self.run_check(lastmod)
+        self.checked = list()
+        page_results, crawler, results = self.run_check(lastmod)
+        self.assertEqual(results, [6, 6])
+        self.assertEqual(page_results.not_modified, 1)
+        # no lastmod: the page is downloaded, its content did not change
+        self.assertEqual(crawler.downloaded, ['https://shop.ch/b'])
+        self.assertEqual(page_results.same_content, 1)
+        self.assertEqual(self.checked, [])
+
+    def test_content_unchanged(self):
+        self.run_check({'https://shop.ch/a': '2021-05-01', 'https://shop.ch/b': '2021-05-01'})
+        self.checked = list()
+        lastmod = {'https://shop.ch/a': '2021-06-01', 'https://shop.ch/b': '2021-06-01'}
+        page_results, crawler, _ = self.run_check(lastmod)
+        self.assertEqual(len(crawler.downloaded), 2)
+        self.assertEqual(page_results.same_content, 2)
+        self.assertEqual(self.checked, [])
+
+    def test_changed_content_is_checked(self):
+        self.run_check({'https://shop.ch/a': '2021-05-01', 'https://shop.ch/b': '2021-05-01'})
+        self.checked = list()
+        self.pages['https://shop.ch/a'] = 'new page a'
+        lastmod = {'https://shop.ch/a': '2021-06-01', 'https://shop.ch/b': '2021-05-01'}
+        page_results, _, results = self.run_check(lastmod)
+        self.assertEqual(results, [6, 10])
+        self.assertEqual(self.checked, ['new page a'])
+        self.assertEqual((page_results.checked, page_results.not_modified), (1, 1))
+
+    def test_other_key_is_checked(self):
+        lastmod = {'https://shop.ch/a': '2021-05-01', 'https://shop.ch/b': '2021-05-01'}
+        self.run_check(lastmod, key=results_key(['goods']))
+        self.checked = list()
+        page_results, _, _ = self.run_check(lastmod, key=results_key(['goods', 'ware']))
+        self.assertEqual(page_results.checked, 2)
+        self.assertEqual(len(self.checked), 2)
+
+    def test_expired_results_are_checked(self):
+        lastmod = {'https://shop.ch/a': '2021-05-01', 'https://shop.ch/b': '2021-05-01'}
+        self.run_check(lastmod)
+        self.checked = list()
+        time.sleep(0.05)
+        page_results, _, _ = self.run_check(lastmod, ttl=0.01)
+        self.assertEqual(page_results.checked, 2)
+        self.assertEqual(len(self.checked), 2)
+
+    def test_reused_results_keep_their_age(self):
+        lastmod = {'https://shop.ch/a': '', 'https://shop.ch/b': ''}
+        self.run_check(lastmod)
+        stored = PageResults('store_identifier', path=self.path)
+        checked_at = stored.get('https://shop.ch/a')[3]
+        stored.close()
+        self.run_check(lastmod)
+        stored = PageResults('store_identifier', path=self.path)
+        self.assertEqual(stored.get('https://shop.ch/a')[3], checked_at)
+        stored.close()
+
+    def test_key_of_keyword_lists(self):
+        self.assertEqual(results_key(['goods'], ['leader']), results_key(['goods'], ['leader']))
+        self.assertNotEqual(results_key(['goods'], ['leader']), results_key(['goods'], ['chief']))
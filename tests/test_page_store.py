@@ -0,0 +1,69 @@
+import unittest
+from types import SimpleNamespace
+
+import requests
+
+from http_client import MAX_PAGE_BYTES, NotHtml
+from page_store import PageStore
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.requests = list()
+
+    def get(self, url, html_only=False, max_bytes=None):
+        self.requests.append((url, html_only, max_bytes))
+        if url.endswith('.pdf'):
+            raise NotHtml(f'{url}: application/pdf')
+        if 'down' in url:
+            raise requests.exceptions.ConnectionError('connection refused')
+        return SimpleNamespace(status_code=200, headers={}, text=f'<html>{url}</html>', url=url + '/de/')
+
+
+class PageStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.pages = PageStore(self.client)
+
+    def test_page_is_downloaded_once(self):
+        first = self.pages.get('https://shop.ch')
+        second = self.pages.get('https://shop.ch')
+        self.assertIs(first, second)
+        self.assertEqual(self.client.requests, [('https://shop.ch', True, MAX_PAGE_BYTES)])
+        self.assertEqual((self.pages.hits, self.pages.misses), (1, 1))
+
+    def test_stored_page(self):
+        page = self.pages.get('https://shop.ch')
+        self.assertEqual(page.url, 'https://shop.ch')
+        self.assertEqual(page.final_url, 'https://shop.ch/de/')
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.text, '<html>https://shop.ch</html>')
+
+    def test_errors_are_kept(self):
+        errors = [('https://shop.ch/a.pdf', NotHtml), ('https://down.ch', requests.exceptions.ConnectionError)]
+        for url, error in errors:
+            for _ in range(2):
+                with self.assertRaises(error):
+                    self.pages.get(url)
+        self.assertEqual(len(self.client.requests), 2)
+        self.assertEqual(self.pages.hits, 2)
+
+    def test_pages_not_kept(self):
+        self.pages.get('https://shop.ch/a', keep=False)
+        self.pages.get('https://shop.ch/a', keep=False)
+        self.assertEqual(len(self.client.requests), 2)
+        self.assertEqual(self.pages.pages, {})
+
+    def test_kept_page_is_used_by_the_last_pass(self):
+        self.pages.get('https://shop.ch/a')
+        self.pages.get('https://shop.ch/a', keep=False)
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_report(self):
+        self.assertEqual(self.pages.hit_ratio, 0.0)
+        for _ in range(4):
+            self.pages.get('https://shop.ch')
+        self.assertEqual(self.pages.hit_ratio, 0.75)
+        self.assertEqual(self.pages.report(), '1 pages, 3 hits, 1 misses, hit ratio 75%')
@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from selenium.common.exceptions import TimeoutException
+
+from http_cache import SnapshotCache
+from render import MARK_STALE, RENDER_PROBE, TabBrowser, get_main_page, needs_rendering
+
+
+class FakeTabDriver(object):
+    """webdriver of a browser with page load strategy "none": get only starts the navigation, it is
+    committed after some probes, until then the probe runs in the document shown before"""
+
+    def __init__(self, commit_after):
+        self.commit_after = commit_after
+        self.switch_to = SimpleNamespace(window=lambda handle: None)
+        self.current_url = 'about:blank'
+        self.stale = False
+        self.navigation = None
+        self.probes = 0
+
+    def get(self, url):
+        if url == 'about:blank':
+            self.current_url, self.stale = url, False
+        else:
+            self.navigation, self.probes = url, 0
+
+    def execute_script(self, script):
+        if script == MARK_STALE:
+            self.stale = True
+            return None
+        assert script == RENDER_PROBE
+        self.probes += 1
+        if self.navigation is not None and self.probes > self.commit_after:
+            self.current_url, self.stale, self.navigation = self.navigation, False, None
+        return {
+            'readyState': 'complete', 'now': 10000, 'lastMutation': 0, 'lastResponse': 0, 'pending': 0,
+            'href': self.current_url, 'stale': self.stale
+        }
+
+    def execute_cdp_cmd(self, command, arguments):
+        pass
+
+    @property
+    def page_source(self):
+        return '<html></html>' if self.current_url == 'about:blank' else '<html>shop</html>'
+
+
+def tab_browser(driver):
+    browser = TabBrowser(tabs=1, max_rss=0)
+    browser.browser = SimpleNamespace(driver=driver, renders=0)
+    browser.idle = ['tab']
+    return browser
+
+
+@mock.patch('render.POLL_INTERVAL', 0.001)
+class TabBrowserTest(unittest.TestCase):
+
+    def test_waits_for_the_navigation(self):
+        driver = FakeTabDriver(commit_after=5)
+        self.assertEqual(tab_browser(driver).render('https://shop.ch/'), ('<html>shop</html>', 'https://shop.ch/'))
+        self.assertGreater(driver.probes, 5)
+
+    def test_previous_document_is_not_the_page(self):
+        driver = FakeTabDriver(commit_after=5)
+        driver.current_url = 'https://other.ch/'
+        self.assertEqual(tab_browser(driver).render('https://shop.ch/'), ('<html>shop</html>', 'https://shop.ch/'))
+
+    def test_load_timeout_without_commit(self):
+        driver = FakeTabDriver(commit_after=10 ** 9)
+        with mock.patch('render.PAGE_LOAD_TIMEOUT', 0.05):
+            with self.assertRaises(TimeoutException):
+                tab_browser(driver).render('https://shop.ch/')
+
+
+TEXT = '<p>' + 'Wir verkaufen Velos und Zubehör aus der Schweiz. ' * 6 + '</p>'
+
+
+def page(body, head=''):
+    return f'<html><head>{head}</head><body>{body}</body></html>'
+
+
+class NeedsRenderingTest(unittest.TestCase):
+
+    def test_complete_pages(self):
+        for contacts in [
+            '<p>info@velo-shop.ch</p><a href="/shop">Shop</a>',
+            '<a href="tel:+41441234567">Anrufen</a>',
+            '<a href="/de/kontakt">Über uns</a>',
+            '<p>Impressum</p><a href="/shop">Shop</a>',
+        ]:
+            self.assertEqual(needs_rendering(page(TEXT + contacts)), '', contacts)
+
+    def test_empty_page(self):
+        self.assertEqual(needs_rendering(''), 'empty page')
+        self.assertEqual(needs_rendering(' \n '), 'empty page')
+
+    def test_single_page_application(self):
+        self.assertEqual(needs_rendering(page('<div id="root"></div>' + TEXT)), 'single page application')
+        self.assertEqual(needs_rendering(page('<app-root></app-root>')), 'single page application')
+        self.assertEqual(needs_rendering(page('<div id="root-menu"></div>' + TEXT + '<a href="/kontakt">K</a>')), '')
+
+    def test_scripts_are_not_text(self):
+        bundle = '<script>' + 'window.__state = {"contact": "info@shop.ch"};' * 20 + '</script>'
+        self.assertEqual(needs_rendering(page(bundle + '<a href="/kontakt">Kontakt</a>')), 'empty body')
+
+    def test_no_links(self):
+        self.assertEqual(needs_rendering(page(TEXT + '<p>info@velo-shop.ch</p>')), 'no links')
+
+    def test_contacts_outside_the_visible_text(self):
+        style = '<style>@media (max-width: 600px) { .contact { display: none } }</style>'
+        self.assertEqual(needs_rendering(page(TEXT + '<a href="/shop">Shop</a>', style)), 'no contacts')
+        json_ld = '<script type="application/ld+json">{"email": "info@velo-shop.ch", "contactPoint": {}}</script>'
+        self.assertEqual(needs_rendering(page(TEXT + '<a href="/shop">Shop</a>' + json_ld)), 'no contacts')
+        self.assertEqual(needs_rendering(page(TEXT + '<a href="/shop">Shop</a><!-- kontakt -->')), 'no contacts')
+
+    def test_bare_at_sign_is_no_contact(self):
+        self.assertEqual(needs_rendering(page(TEXT + '<p>@velo_shop</p><a href="/shop">Shop</a>')), 'no contacts')
+
+
+class FailingPages(object):
+
+    def get(self, url):
+        raise ConnectionError('connection refused')
+
+
+class MainPageTest(unittest.TestCase):
+
+    @mock.patch('render.render', return_value=('<html><a href="kontakt">Kontakt</a></html>', 'https://www.shop.ch/de/'))
+    def test_rendered_page_has_the_url_of_the_browser(self, render):
+        document, source = get_main_page(FailingPages(), 'https://shop.ch')
+        self.assertEqual(source, 'rendered')
+        self.assertEqual(document.url, 'https://www.shop.ch/de/')
+        render.assert_called_once_with('https://shop.ch', None)
+
+
+class SnapshotCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.snapshots = SnapshotCache(self.folder, ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_snapshot_keeps_the_final_url(self):
+        self.snapshots.put('https://shop.ch', '<html>shop</html>', 'https://www.shop.ch/de/')
+        self.assertEqual(self.snapshots.lookup('https://shop.ch'), ('<html>shop</html>', 'https://www.shop.ch/de/'))
+
+    def test_snapshot_without_final_url(self):
+        self.snapshots.put('https://shop.ch', '<html>shop</html>')
+        self.assertEqual(self.snapshots.lookup('https://shop.ch'), ('<html>shop</html>', 'https://shop.ch'))
+
+    def test_expired_snapshot(self):
+        self.snapshots.put('https://shop.ch', '<html>shop</html>', 'https://www.shop.ch/de/')
+        self.snapshots.ttl = 0.01
+        time.sleep(0.02)
+        self.assertIsNone(self.snapshots.lookup('https://shop.ch'))
@@ -0,0 +1,87 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from scheduler import HostScheduler, MAX_CRAWL_DELAY, TokenBucket
+from utils import Deadline, DeadlineExceeded
+
+
+class FakeSession(object):
+    def __init__(self, robots=None):
+        self.robots = robots
+        self.requests = list()
+
+    def get(self, url, timeout=None):
+        self.requests.append((url, timeout))
+        if self.robots is None:
+            return SimpleNamespace(status_code=404, text='')
+        return SimpleNamespace(status_code=200, text=self.robots)
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_is_free(self):
+        bucket = TokenBucket(rate=10, burst=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_reservations_beyond_the_burst_are_queued(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.reserve()
+        delays = [bucket.reserve() for _ in range(3)]
+        for delay, expected in zip(delays, [0.1, 0.2, 0.3]):
+            self.assertAlmostEqual(delay, expected, delta=0.01)
+
+    def test_tokens_refill_up_to_the_burst(self):
+        bucket = TokenBucket(rate=100, burst=2)
+        bucket.reserve()
+        bucket.reserve()
+        time.sleep(0.05)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertGreater(bucket.reserve(), 0.0)
+
+
+class HostSchedulerTest(unittest.TestCase):
+
+    def test_default_pace(self):
+        scheduler = HostScheduler(FakeSession(), rate=5, burst=2)
+        bucket = scheduler.bucket('https://shop.ch/a')
+        self.assertEqual((bucket.rate, bucket.burst), (5, 2))
+
+    def test_crawl_delay(self):
+        scheduler = HostScheduler(FakeSession('User-agent: *\nCrawl-delay: 2\n'))
+        bucket = scheduler.bucket('https://shop.ch/a')
+        self.assertEqual((bucket.rate, bucket.burst), (0.5, 1))
+
+    def test_crawl_delay_is_capped(self):
+        scheduler = HostScheduler(FakeSession('User-agent: *\nCrawl-delay: 3600\n'))
+        self.assertEqual(scheduler.bucket('https://shop.ch/a').rate, 1 / MAX_CRAWL_DELAY)
+
+    def test_robots_is_read_once_per_host(self):
+        session = FakeSession('User-agent: *\nSitemap: https://shop.ch/sitemap.xml\n')
+        scheduler = HostScheduler(session)
+        scheduler.bucket('https://shop.ch/a')
+        scheduler.bucket('https://shop.ch/b')
+        self.assertEqual(scheduler.sitemaps('https://shop.ch/'), ['https://shop.ch/sitemap.xml'])
+        self.assertEqual([url for url, _ in session.requests], ['https://shop.ch/robots.txt'])
+
+    def test_prepaid_wait_returns_at_once(self):
+        scheduler = HostScheduler(FakeSession(), rate=0.1, burst=1)
+        scheduler.reserve('https://shop.ch/a')
+        started = time.monotonic()
+        scheduler.wait('https://shop.ch/a')
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_robots_timeout_follows_the_deadline(self):
+        session = FakeSession()
+        deadline = Deadline(1)
+        HostScheduler(session, deadline=lambda: deadline).bucket('https://shop.ch/a')
+        connect, read = session.requests[0][1]
+        self.assertLessEqual(read, 1)
+
+    def test_spent_deadline_does_not_forget_robots(self):
+        deadline = Deadline(0)
+        scheduler = HostScheduler(FakeSession(), deadline=lambda: deadline)
+        with self.assertRaises(DeadlineExceeded):
+            scheduler.bucket('https://shop.ch/a')
+        self.assertNotIn('shop.ch', scheduler.buckets)
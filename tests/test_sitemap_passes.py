@@ -0,0 +1,71 @@
+import unittest
+from types import SimpleNamespace
+
+from http_client import NotHtml
+from page_store import PageStore
+from store_identifier import DomainsAndSubdomains
+
+try:
+    from collect_contact_information import LeadGeneration
+except ImportError:  # names_dataset is not installed
+    LeadGeneration = None
+
+PAGE = '''<html><body><div>
+  <p>Geschäftsführer Hans Muster</p><p>Tel. 044 123 45 67</p><p>hans@shop.ch</p>
+</div></body></html>'''
+
+
+class FakeClient(object):
+    """serves PAGE for every url, urls of pdf files are not html"""
+
+    def __init__(self):
+        self.requested = list()
+
+    def get(self, url, html_only=False, max_bytes=None):
+        self.requested.append(url)
+        if url.endswith('.pdf'):
+            raise NotHtml(f'{url}: application/pdf')
+        return SimpleNamespace(status_code=200, headers={}, text=PAGE, url=url)
+
+
+class StoreIdentifierPassesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.identifier = DomainsAndSubdomains('domains.xlsx')
+        self.identifier.pages = PageStore(self.client)
+
+    def test_team_pass_skips_non_html(self):
+        sitemap = ['https://shop.ch/kontakt.pdf', 'https://shop.ch/team', 'https://shop.ch/kontakt']
+        phones, emails = self.identifier.get_leader_phone_and_email_from_sitemap_section_team(sitemap)
+        self.assertEqual(phones, ['0441234567'])
+        self.assertEqual(emails, ['hans@shop.ch'])
+        self.assertEqual(self.client.requested, sitemap)
+
+    def test_leader_pass_skips_non_html(self):
+        sitemap = ['https://shop.ch/Geschäftsführer.pdf', 'https://shop.ch/Geschäftsführer']
+        phones, emails = self.identifier.get_leader_phone_and_email_from_sitemap(sitemap)
+        self.assertEqual(phones, ['0441234567'])
+        self.assertEqual(emails, ['hans@shop.ch'])
+
+
+@unittest.skipIf(LeadGeneration is None, 'names_dataset is not installed')
+class LeadGenerationPassesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.generation = LeadGeneration('https://shop.ch')
+        self.generation.pages = PageStore(self.client)
+
+    def test_team_pass_skips_non_html(self):
+        sitemap = ['https://shop.ch/kontakt.pdf', 'https://shop.ch/team', 'https://shop.ch/kontakt']
+        phones, emails, _, _ = self.generation.get_leader_phone_and_email_from_sitemap_section_team(sitemap)
+        self.assertEqual(phones, ['0441234567'])
+        self.assertEqual(emails, ['hans@shop.ch'])
+        self.assertEqual(self.client.requested, sitemap)
+
+    def test_leader_pass_skips_non_html(self):
+        sitemap = ['https://shop.ch/Geschäftsführer.pdf', 'https://shop.ch/Geschäftsführer']
+        phones, emails, _ = self.generation.get_leader_phone_and_email_from_sitemap(sitemap)
+        self.assertEqual(phones, ['0441234567'])
+        self.assertEqual(emails, ['hans@shop.ch'])
@@ -0,0 +1,60 @@
+import gzip
+import unittest
+
+from sitemaps import parse_sitemap
+
+URLSET = b'''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://shop.ch/a</loc><lastmod>2021-05-01</lastmod></url>
+  <url><loc> https://shop.ch/b </loc></url>
+  <url><lastmod>2021-05-01</lastmod></url>
+</urlset>'''
+
+INDEX = b'''<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://shop.ch/sitemap-1.xml</loc><lastmod>2021-05-02</lastmod></sitemap>
+</sitemapindex>'''
+
+
+class ParseSitemapTest(unittest.TestCase):
+
+    def test_urlset(self):
+        self.assertEqual(list(parse_sitemap(URLSET)), [
+            ('page', 'https://shop.ch/a', '2021-05-01'), ('page', 'https://shop.ch/b', None)
+        ])
+
+    def test_index(self):
+        self.assertEqual(list(parse_sitemap(INDEX)), [('sitemap', 'https://shop.ch/sitemap-1.xml', '2021-05-02')])
+
+    def test_gzip(self):
+        self.assertEqual(list(parse_sitemap(gzip.compress(URLSET))), list(parse_sitemap(URLSET)))
+
+    def test_byte_order_mark(self):
+        self.assertEqual(list(parse_sitemap(b'\xef\xbb\xbf' + URLSET)), list(parse_sitemap(URLSET)))
+
+    def test_rss(self):
+        rss = b'''<rss><channel><item><link>https://shop.ch/news</link><pubDate>Sat, 01 May 2021</pubDate></item>
+        </channel></rss>'''
+        self.assertEqual(list(parse_sitemap(rss)), [('page', 'https://shop.ch/news', 'Sat, 01 May 2021')])
+
+    def test_atom(self):
+        atom = b'''<feed xmlns="http://www.w3.org/2005/Atom"><entry><link href="https://shop.ch/post"/>
+        <updated>2021-05-01</updated></entry></feed>'''
+        self.assertEqual(list(parse_sitemap(atom)), [('page', 'https://shop.ch/post', '2021-05-01')])
+
+    def test_plain_text_is_told_by_the_content(self):
+        text = b'https://shop.ch/a\r\n\n  https://shop.ch/b  \nnot a url\n'
+        self.assertEqual(list(parse_sitemap(text)), [
+            ('page', 'https://shop.ch/a', None), ('page', 'https://shop.ch/b', None)
+        ])
+
+    def test_broken_xml(self):
+        self.assertEqual(list(parse_sitemap(b'<urlset><url><loc>https://shop.ch/a</loc></url')), [
+            ('page', 'https://shop.ch/a', None)
+        ])
+        self.assertEqual(list(parse_sitemap(b'<')), [])
+
+    def test_entities_are_not_resolved(self):
+        xxe = b'''<?xml version="1.0"?><!DOCTYPE r [<!ENTITY e SYSTEM "file:///etc/passwd">]>
+        <urlset><url><loc>https://shop.ch/&e;</loc></url></urlset>'''
+        for _, url, _ in parse_sitemap(xxe):
+            self.assertNotIn('root:', url)
@@ -0,0 +1,82 @@
+import threading
+import unittest
+
+from url_index import LEADER, OTHER, PRODUCT, TEAM, UrlIndex
+
+URLS = [
+    'https://shop.ch/',
+    'https://shop.ch/team/chief-officer',
+    'https://shop.ch/kontakt',
+    'https://shop.ch/produkte/velo-produ-item',
+    'https://shop.ch/blog',
+]
+
+
+class Sitemap(object):
+    """a sitemap read on demand, remembers how many urls were taken"""
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.taken = 0
+
+    def __iter__(self):
+        for url in self.urls:
+            self.taken += 1
+            yield url
+
+
+def url_index(sitemap):
+    return UrlIndex(
+        sitemap, leader_words=['chief', 'head'], team_words=['team', 'kontakt'], goods_words=['produ', 'item']
+    )
+
+
+class UrlIndexTest(unittest.TestCase):
+
+    def test_buckets(self):
+        index = url_index(Sitemap(URLS))
+        self.assertEqual(list(index.urls(LEADER)), ['https://shop.ch/team/chief-officer'])
+        self.assertEqual(list(index.urls(TEAM)), ['https://shop.ch/team/chief-officer', 'https://shop.ch/kontakt'])
+        self.assertEqual(list(index.urls(PRODUCT)), ['https://shop.ch/produkte/velo-produ-item'])
+        self.assertEqual(list(index.urls(OTHER)), ['https://shop.ch/', 'https://shop.ch/blog'])
+        self.assertEqual(index.leader_matches, {'https://shop.ch/team/chief-officer': ['chief']})
+        self.assertEqual(index.report(), '1 leader, 2 team, 1 product, 2 other')
+
+    def test_sitemap_is_read_once(self):
+        sitemap = Sitemap(URLS)
+        index = url_index(sitemap)
+        for bucket in (LEADER, TEAM, PRODUCT, OTHER, LEADER):
+            list(index.urls(bucket))
+        self.assertEqual(sitemap.taken, len(URLS))
+
+    def test_pass_starts_before_the_sitemap_is_read(self):
+        sitemap = Sitemap(URLS)
+        index = url_index(sitemap)
+        self.assertEqual(next(index.urls(LEADER)), 'https://shop.ch/team/chief-officer')
+        self.assertEqual(sitemap.taken, 2)
+
+    def test_goods_count(self):
+        index = url_index(Sitemap(URLS + ['https://shop.ch/item/item']))
+        # like str.count: every occurrence of every keyword counts
+        self.assertEqual(index.goods_count(), 5)
+        self.assertEqual(index.goods['https://shop.ch/produkte/velo-produ-item'], 3)
+
+    def test_concurrent_passes(self):
+        urls = [f'https://shop.ch/team/{number}' for number in range(2000)]
+        index = url_index(Sitemap(urls))
+        results = list()
+
+        def read():
+            results.append(list(index.urls(TEAM)))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [urls] * 4)
+
+    def test_empty_sitemap(self):
+        index = url_index([])
+        self.assertEqual(list(index.urls(TEAM)), [])
+        self.assertEqual(index.goods_count(), 0)
@@ -0,0 +1,81 @@
+import threading
+
+from keywords import keyword_counter
+
+# buckets of the sitemap urls
+LEADER = 'leader'
+TEAM = 'team'
+PRODUCT = 'product'
+OTHER = 'other'
+
+
+class UrlIndex(object):
+    """sitemap urls sorted into buckets in one pass over the sitemap, the passes of a domain read
+    their bucket instead of testing every url against every keyword again (one keyword automaton per bucket)
+
+    - leader: the url contains a word of leader_words (leader_matches keeps which ones)
+    - team: the url contains a word of team_words (team, about us and contact pages)
+    - product: the url contains words of goods_words (goods keeps how often)
+    - other: none of them
+
+    a url can be in leader, team and product at the same time. Urls are classified while the sitemap
+    stream yields them, so the first pass still starts with the first sitemap"""
+
+    def __init__(self, urls, leader_words=(), team_words=(), goods_words=()):
+        self.sitemap = urls
+        self.source = iter(urls)
+        self.leader_counter = keyword_counter(leader_words)
+        self.team_counter = keyword_counter(team_words)
+        self.goods_counter = keyword_counter(goods_words)
+        self.buckets = {LEADER: list(), TEAM: list(), PRODUCT: list(), OTHER: list()}
+        self.leader_matches = dict()
+        self.goods = dict()
+        self.done = False
+        self.lock = threading.Lock()
+
+    def classify(self, url):
+        leader_matches = self.leader_counter.found(url)
+        if leader_matches:
+            self.leader_matches[url] = leader_matches
+            self.buckets[LEADER].append(url)
+        team = self.team_counter.found(url)
+        if team:
+            self.buckets[TEAM].append(url)
+        goods = self.goods_counter.count(url)
+        if goods:
+            self.goods[url] = goods
+            self.buckets[PRODUCT].append(url)
+        if not (leader_matches or team or goods):
+            self.buckets[OTHER].append(url)
+
+    def more(self):
+        """classify the next url of the sitemap, False once the sitemap is exhausted"""
+        with self.lock:
+            if self.done:
+                return False
+            try:
+                self.classify(next(self.source))
+                return True
+            except StopIteration:
+                self.done = True
+                return False
+
+    def urls(self, bucket):
+        """urls of the bucket: the ones classified so far, then the rest of the sitemap"""
+        urls = self.buckets[bucket]
+        index = 0
+        while True:
+            if index < len(urls):
+                yield urls[index]
+                index += 1
+            elif not self.more() and index >= len(urls):
+                return
+
+    def goods_count(self):
+        """keywords of goods in all urls of the sitemap"""
+        while self.more():
+            pass
+        return sum(self.goods.values())
+
+    def report(self):
+        return ', '.join(f'{len(urls)} {bucket}' for bucket, urls in self.buckets.items())
@@ -4,13 +4,83 @@ import os
 import re
 import smtplib
 import sys
+import time
 from typing import List
+from urllib.parse import urldefrag, urljoin, urlsplit
 from pyisemail import is_email
-import dns.resolver
+from url_normalize import url_normalize
 
+import dns_cache
 
-def check_email_accessible(email):
+# upper bounds of one network operation (seconds), the deadline of the domain may cut them shorter
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+
+# dns and smtp conversation of one email check
+EMAIL_CHECK_TIMEOUT = 10
+
+# selenium page load
+PAGE_LOAD_TIMEOUT = 60
+
+# share of the task timeout given to the network work of a domain, the rest is left for writing the results
+DEADLINE_SHARE = 0.9
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline(object):
+    """time budget of one domain, every network operation gets a timeout sized to what is left of it"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """seconds left"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, limit):
+        """timeout for one operation: no more than limit and no more than what is left"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('the time budget of the domain is spent')
+        return min(limit, remaining)
+
+    def http_timeout(self, timeout=None):
+        """(connect, read) timeout for requests, timeout is the limit asked by the caller"""
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect, read = min(CONNECT_TIMEOUT, timeout or CONNECT_TIMEOUT), timeout or READ_TIMEOUT
+        return self.timeout(connect), self.timeout(read)
+
+
+def get_base_url(soup, url):
+    """url against which relative links of the page are resolved (takes <base href> into account)"""
+    base_url = url_normalize(url)
+    base = soup.find('base', href=True)
+    if base is not None:
+        base_url = urljoin(base_url, base['href'])
+    return base_url
+
+
+def resolve_links(base_url, links):
+    """resolve hrefs against the base url once, drop fragments and non-http links, remove duplicates"""
+    resolved = list()
+    for link in links:
+        link = urldefrag(urljoin(base_url, link.strip()))[0]
+        if urlsplit(link).scheme in ('http', 'https') and link not in resolved:
+            resolved.append(link)
+    return resolved
+
+
+def check_email_accessible(email, deadline=None):
     try:
+        timeout = deadline.timeout(EMAIL_CHECK_TIMEOUT) if deadline else EMAIL_CHECK_TIMEOUT
 
         from_address = 'email.checker2021@gmail.com'
 
@@ -22,13 +92,11 @@ def check_email_accessible(email):
         # first_part, second_part = email.split('@')
         # fake_email = first_part + 'ashdfabebdfjksjakuahfka' + '@' + second_part
 
-        # MX record lookup
-        records = dns.resolver.resolve(domain, 'MX')
-        mx_record = records[0].exchange
-        mx_record = str(mx_record)
+        # MX record lookup (cached, gen_email checks up to nine addresses of one domain)
+        mx_record = dns_cache.install().resolve_mx(domain, lifetime=timeout)[0]
 
         # SMTP lib setup (use debug level for full output)
-        server = smtplib.SMTP()
+        server = smtplib.SMTP(timeout=timeout)
         server.set_debuglevel(0)
 
         # SMTP Conversation